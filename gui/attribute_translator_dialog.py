@@ -6,18 +6,23 @@ import re
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QLineEdit, 
     QTextEdit, QProgressBar, QLabel, QFileDialog, QGroupBox, QMessageBox, 
-    QDialogButtonBox, QSpinBox, QFormLayout
+    QDialogButtonBox, QSpinBox, QFormLayout, QCheckBox
 )
 from PyQt6.QtCore import QThread, pyqtSignal
 
 from logic.attribute_translator import run_attribute_translator
+from logic.translation_backends import BACKENDS, get_backend_class
 
 class Worker(QThread):
     progress = pyqtSignal(str)
     finished = pyqtSignal(str)
 
-    def __init__(self, input_path, id_column, desc_column, lang, batch_size):
+    def __init__(self, input_path, id_column, desc_column, lang, batch_size, backend_name='google', backend_options=None, num_workers=1, use_translation_memory=True):
         super().__init__()
+        self.backend_name = backend_name
+        self.backend_options = backend_options
+        self.num_workers = num_workers
+        self.use_translation_memory = use_translation_memory
         self.input_path = input_path
         self.id_column = id_column
         self.desc_column = desc_column
@@ -30,9 +35,12 @@ class Worker(QThread):
             self.id_column, 
             self.desc_column, 
             self.lang, 
-            1, # num_workers is not used anymore
+            self.num_workers,
             self.batch_size,
-            lambda msg: self.progress.emit(msg)
+            lambda msg: self.progress.emit(msg),
+            self.backend_name,
+            self.backend_options,
+            self.use_translation_memory
         )
         self.finished.emit(result)
 
@@ -78,7 +86,34 @@ class AttributeTranslatorDialog(QDialog):
         settings_layout.addRow("Kolumna z ID Produktu:", self.id_column_combo)
         settings_layout.addRow("Kolumna z opisem HTML:", self.description_column_combo)
         settings_layout.addRow("Język docelowy:", self.target_lang_combo)
+        self.extra_target_langs_input = QLineEdit()
+        self.extra_target_langs_input.setPlaceholderText("kody, np. de, cs, sk")
+        self.extra_target_langs_input.setToolTip("Kody kolejnych języków docelowych, oddzielone przecinkami.\nOpisy są skanowane raz, a każdy język trafia do osobnej kolumny \"<opis>_generated_<kod>\".")
+        settings_layout.addRow("Dodatkowe języki:", self.extra_target_langs_input)
         settings_layout.addRow("Rozmiar paczki (Batch Size):", self.batch_size_input)
+        self.num_workers_input = QSpinBox()
+        self.num_workers_input.setMinimum(1)
+        self.num_workers_input.setMaximum(16)
+        self.num_workers_input.setValue(3)
+        self.num_workers_input.setToolTip("Liczba paczek tłumaczonych jednocześnie. Wszystkie wątki dzielą jeden limiter,\nktóry sam zwalnia po odrzuceniu zapytań przez serwis i przyspiesza, gdy wszystko działa.")
+        settings_layout.addRow("Liczba wątków:", self.num_workers_input)
+        self.translation_memory_checkbox = QCheckBox("Używaj pamięci tłumaczeń (nie tłumacz ponownie znanych tekstów)")
+        self.translation_memory_checkbox.setChecked(True)
+        settings_layout.addRow("", self.translation_memory_checkbox)
+
+        self.backend_combo = QComboBox()
+        for backend in BACKENDS.values():
+            self.backend_combo.addItem(backend.label, backend.name)
+        self.backend_api_key_input = QLineEdit()
+        self.backend_api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.backend_base_url_input = QLineEdit()
+        self.backend_base_url_input.setPlaceholderText("opcjonalnie, np. http://localhost:8000/v1")
+        self.backend_model_input = QLineEdit()
+        self.backend_model_input.setPlaceholderText("opcjonalnie")
+        settings_layout.addRow("Silnik tłumaczeń:", self.backend_combo)
+        settings_layout.addRow("Klucz API silnika:", self.backend_api_key_input)
+        settings_layout.addRow("Adres API silnika:", self.backend_base_url_input)
+        settings_layout.addRow("Model (OpenAI):", self.backend_model_input)
         settings_group.setLayout(settings_layout)
         main_layout.addWidget(settings_group)
 
@@ -146,18 +181,36 @@ class AttributeTranslatorDialog(QDialog):
         id_col = self.id_column_combo.currentText()
         desc_col = self.description_column_combo.currentText()
         lang_name = self.target_lang_combo.currentText()
-        lang_code = self.language_map_display[lang_name]
+        lang_codes = [self.language_map_display[lang_name]]
+        for code in re.split(r'[\s,;]+', self.extra_target_langs_input.text().strip().lower()):
+            if not code or code in lang_codes: continue
+            if code not in self.language_map_display.values():
+                QMessageBox.warning(self, "Uwaga", f"Nieznany kod języka docelowego: '{code}'.")
+                return
+            lang_codes.append(code)
         batch_size = self.batch_size_input.value()
+        backend_name = self.backend_combo.currentData()
+        backend_options = {
+            'api_key': self.backend_api_key_input.text().strip(),
+            'base_url': self.backend_base_url_input.text().strip(),
+            'model': self.backend_model_input.text().strip()
+        }
 
         if not id_col or not desc_col:
             QMessageBox.warning(self, "Uwaga", "Wybierz kolumnę z ID i kolumnę z opisem.")
             return
+        if get_backend_class(backend_name).requires_api_key and not backend_options['api_key']:
+            QMessageBox.warning(self, "Uwaga", "Wybrany silnik tłumaczeń wymaga klucza API.")
+            return
 
         self.start_button.setEnabled(False)
         self.log_output.clear()
         self.log_message("--- Rozpoczynam tłumaczenie atrybutów ---")
         
-        self.worker_thread = Worker(self.input_csv_path, id_col, desc_col, lang_code, batch_size)
+        self.worker_thread = Worker(
+            self.input_csv_path, id_col, desc_col, lang_codes if len(lang_codes) > 1 else lang_codes[0], batch_size, backend_name, backend_options,
+            self.num_workers_input.value(), self.translation_memory_checkbox.isChecked()
+        )
         self.worker_thread.progress.connect(self.log_message)
         self.worker_thread.finished.connect(self.task_finished)
         self.worker_thread.start()
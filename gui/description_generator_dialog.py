@@ -3,7 +3,7 @@ import pandas as pd
 from PyQt6.QtWidgets import (
     QApplication, QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, 
     QTextEdit, QProgressBar, QLabel, QFileDialog, QCheckBox,
-    QMessageBox, QDialogButtonBox, QGroupBox, QColorDialog
+    QMessageBox, QDialogButtonBox, QGroupBox, QColorDialog, QSpinBox
 )
 from PyQt6.QtCore import QThread, pyqtSignal, QObject
 from PyQt6.QtGui import QColor
@@ -11,14 +11,22 @@ import os
 import time
 import re
 
-from logic.description_generator import run_description_generator
+from logic.description_generator import run_description_generator, MAX_CONCURRENT_PRODUCTS, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, PRODUCTS_PER_FEATURES_REQUEST, MAX_PRODUCTS_PER_FEATURES_REQUEST
+from logic.feature_cache import FEATURE_CACHE_FILE
 
 class DescriptionGeneratorWorker(QObject):
     log_message = pyqtSignal(str)
     finished = pyqtSignal(str, float)
 
-    def __init__(self, api_key, input_path, prompt, use_html_frame, frame_color, id_column, desc_column):
+    def __init__(self, api_key, input_path, prompt, use_html_frame, frame_color, id_column, desc_column, max_concurrency=MAX_CONCURRENT_PRODUCTS, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE, use_batch_api=False, base_url="", use_feature_cache=True, products_per_request=PRODUCTS_PER_FEATURES_REQUEST):
         super().__init__()
+        self.products_per_request = products_per_request
+        self.use_feature_cache = use_feature_cache
+        self.use_batch_api = use_batch_api
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
         self.api_key = api_key
         self.input_path = input_path
         self.prompt = prompt
@@ -35,7 +43,9 @@ class DescriptionGeneratorWorker(QObject):
             final_path = run_description_generator(
                 self.api_key, self.input_path, self.prompt, self.use_html_frame, 
                 self.frame_color, self.id_column, self.desc_column, 
-                self.log_message.emit, lambda: not self.is_running
+                self.log_message.emit, lambda: not self.is_running,
+                self.max_concurrency, self.requests_per_minute, self.tokens_per_minute,
+                self.use_batch_api, self.base_url, self.use_feature_cache, self.products_per_request
             )
         except Exception as e:
             self.log_message.emit(f"Wystąpił krytyczny błąd w wątku: {e}")
@@ -69,6 +79,11 @@ class DescriptionGeneratorDialog(QDialog):
         self.api_key_input = QLineEdit()
         self.api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
         api_layout.addWidget(self.api_key_input)
+        api_layout.addWidget(QLabel("Adres API:"))
+        self.base_url_input = QLineEdit()
+        self.base_url_input.setPlaceholderText("opcjonalnie, np. http://127.0.0.1:8765/v1")
+        self.base_url_input.setToolTip("Puste pole - oficjalne API OpenAI.\nDo testów bez kosztów uruchom lokalny serwer: python -m logic.local_openai_server")
+        api_layout.addWidget(self.base_url_input)
         config_layout.addLayout(api_layout)
 
         file_layout = QHBoxLayout()
@@ -123,6 +138,45 @@ class DescriptionGeneratorDialog(QDialog):
         format_group_box.setLayout(format_layout)
         main_layout.addWidget(format_group_box)
 
+        # Krok 4: Wydajność
+        performance_group_box = QGroupBox("Krok 4: Wydajność")
+        performance_layout = QHBoxLayout()
+        performance_layout.addWidget(QLabel("Produkty naraz:"))
+        self.concurrency_input = QSpinBox()
+        self.concurrency_input.setRange(1, 64)
+        self.concurrency_input.setValue(MAX_CONCURRENT_PRODUCTS)
+        performance_layout.addWidget(self.concurrency_input)
+        performance_layout.addWidget(QLabel("Zapytania/min:"))
+        self.requests_per_minute_input = QSpinBox()
+        self.requests_per_minute_input.setRange(1, 100000)
+        self.requests_per_minute_input.setValue(REQUESTS_PER_MINUTE)
+        performance_layout.addWidget(self.requests_per_minute_input)
+        performance_layout.addWidget(QLabel("Tokeny/min:"))
+        self.tokens_per_minute_input = QSpinBox()
+        self.tokens_per_minute_input.setRange(1000, 100000000)
+        self.tokens_per_minute_input.setSingleStep(1000)
+        self.tokens_per_minute_input.setValue(TOKENS_PER_MINUTE)
+        performance_layout.addWidget(self.tokens_per_minute_input)
+        performance_layout.addWidget(QLabel("Produkty na zapytanie o cechy:"))
+        self.products_per_request_input = QSpinBox()
+        self.products_per_request_input.setRange(1, MAX_PRODUCTS_PER_FEATURES_REQUEST)
+        self.products_per_request_input.setValue(PRODUCTS_PER_FEATURES_REQUEST)
+        self.products_per_request_input.setToolTip("Cechy kilku krótkich opisów są wyodrębniane jednym zapytaniem (odpowiedź JSON według ID produktu),\nco zmniejsza liczbę zapytań. Przy niepoprawnej odpowiedzi produkty są wysyłane pojedynczo.\nNie dotyczy trybu wsadowego.")
+        performance_layout.addWidget(self.products_per_request_input)
+        self.batch_api_checkbox = QCheckBox("Tryb wsadowy (Batch API)")
+        self.batch_api_checkbox.setToolTip("Wszystkie produkty są wysyłane jako zadania wsadowe: taniej (ok. 50%) i bez limitów zapytań na minutę,\nale wyniki pojawiają się dopiero po zakończeniu zadań (zwykle do kilku godzin, maks. 24h).\nPo zamknięciu programu ponowne uruchomienie pobiera wyniki wysłanych wcześniej zadań.")
+        performance_layout.addWidget(self.batch_api_checkbox)
+        self.feature_cache_checkbox = QCheckBox("Zapamiętuj wyodrębnione cechy")
+        self.feature_cache_checkbox.setChecked(True)
+        self.feature_cache_checkbox.setToolTip(f"Cechy produktów są zapisywane w pliku '{FEATURE_CACHE_FILE}' (klucz: model i oczyszczony opis).\nPonowne uruchomienie, np. ze zmienionym promptem, wysyła tylko zapytania o treść kreatywną.")
+        performance_layout.addWidget(self.feature_cache_checkbox)
+        performance_info_label = QLabel("ⓘ")
+        performance_info_label.setToolTip("Limity zapytań i tokenów na minutę znajdziesz w ustawieniach konta OpenAI (Limits).\nKażdy model ma własny limit - generator pilnuje ich osobno i nigdy go nie przekracza.")
+        performance_layout.addWidget(performance_info_label)
+        performance_layout.addStretch()
+        performance_group_box.setLayout(performance_layout)
+        main_layout.addWidget(performance_group_box)
+
         # Start / Stop
         self.start_button = QPushButton("Rozpocznij generowanie")
         self.start_button.clicked.connect(self.start_generation)
@@ -199,7 +253,10 @@ class DescriptionGeneratorDialog(QDialog):
         self.thread = QThread()
         self.worker = DescriptionGeneratorWorker(
             api_key, self.input_csv_path, prompt, use_html_frame, 
-            frame_color, id_column, desc_column
+            frame_color, id_column, desc_column, self.concurrency_input.value(),
+            self.requests_per_minute_input.value(), self.tokens_per_minute_input.value(),
+            self.batch_api_checkbox.isChecked(), self.base_url_input.text().strip(), self.feature_cache_checkbox.isChecked(),
+            self.products_per_request_input.value()
         )
         self.worker.moveToThread(self.thread)
 
@@ -227,6 +284,13 @@ class DescriptionGeneratorDialog(QDialog):
         self.color_button.setEnabled(enabled and self.html_frame_checkbox.isChecked())
         self.id_column_input.setEnabled(enabled)
         self.description_column_input.setEnabled(enabled)
+        self.concurrency_input.setEnabled(enabled)
+        self.requests_per_minute_input.setEnabled(enabled)
+        self.tokens_per_minute_input.setEnabled(enabled)
+        self.products_per_request_input.setEnabled(enabled)
+        self.batch_api_checkbox.setEnabled(enabled)
+        self.feature_cache_checkbox.setEnabled(enabled)
+        self.base_url_input.setEnabled(enabled)
 
     def log_message(self, message):
         timestamp = time.strftime("%H:%M:%S")
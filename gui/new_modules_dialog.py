@@ -11,6 +11,8 @@ class NewModulesDialog(QDialog):
         self.dest_menu_id_input = QLineEdit(self)
         
         self.is_sync_filters = "Synchronizuj filtry menu" in title
+        # Te moduły aktualizują kilka języków w jednym przebiegu
+        self.allows_multiple_langs = title in ("Synchronizuj priorytety węzłów", "Synchronizuj opisy góra/dół")
 
         if self.is_sync_filters:
             self.source_lang_id_input = QLineEdit(self)
@@ -29,7 +31,9 @@ class NewModulesDialog(QDialog):
         form_layout.addRow("ID sklepu docelowego:", self.dest_shop_id_input)
         form_layout.addRow("ID menu docelowego:", self.dest_menu_id_input)
         if self.is_sync_filters:
-            form_layout.addRow("Język docelowy (opcjonalny, np. cze):", self.dest_lang_id_input)
+            form_layout.addRow("Języki docelowe (opcjonalne, np. cze, ger):", self.dest_lang_id_input)
+        elif self.allows_multiple_langs:
+            form_layout.addRow("Języki do aktualizacji (np. eng, cze, ger):", self.lang_id_input)
         else:
             form_layout.addRow("Język do aktualizacji (np. eng, cze):", self.lang_id_input)
 
@@ -1,17 +1,20 @@
 
 import pandas as pd
-from bs4 import BeautifulSoup
 from deep_translator import GoogleTranslator
 import time
 import threading
+import queue
+import bisect
+import contextlib
+from itertools import zip_longest
 from collections import deque
-import math
-import re
 import os
 import random
 import logging
 import requests
 import io
+import re
+import json
 import traceback
 
 from PyQt6.QtWidgets import (
@@ -21,28 +24,80 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QThread, pyqtSignal, QObject, QSettings
 
+from logic.rate_limiter import RateLimiter
+from logic.translation_memory import TranslationMemory, TRANSLATION_MEMORY_FILE
+from logic.translation_patches import apply_translation_patches
+from logic.translation_backends import BACKENDS, RateLimitError, create_backend, get_backend_class
+from logic.html_fragments import extract_cells, assemble_cells, process_in_chunks, create_process_pool
+
 # --- Konfiguracja ---
 ID_COLUMN = 'ID'
 ACTIVATE_COOLDOWN_AFTER_RETRIES = 2
 GLOBAL_COOLDOWN_MINUTES = 15
-CHARACTER_LIMIT = 4800 # Google's unofficial limit is ~5000
-
-class RateLimiter:
-    def __init__(self, requests_per_second):
-        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else float('inf')
-        self.lock = threading.Lock()
-        self.last_request_time = time.monotonic()
-
-    def wait(self):
-        with self.lock:
-            now = time.monotonic()
-            elapsed = now - self.last_request_time
-            if elapsed > 10:
-                self.last_request_time = now - self.min_interval
-                elapsed = self.min_interval
-            if elapsed < self.min_interval:
-                time.sleep(self.min_interval - elapsed)
-            self.last_request_time = time.monotonic()
+STREAM_CHUNK_ROWS = 2000 # wierszy na paczkę w trybie strumieniowym
+PACKED_SEPARATOR = "\n" # fragmenty paczki są wysyłane jednym zapytaniem, rozdzielone nową linią
+PACKING_MISMATCH_LIMIT = 5 # po tylu niezgodnych odpowiedziach łączenie fragmentów jest wyłączane
+PACKED_LENGTH_RATIO = 3.0 # fragment paczki, którego tłumaczenie jest tyle razy dłuższe lub krótsze od oryginału, uznajemy za przesunięty...
+PACKED_LENGTH_SLACK = 10 # ...z tolerancją tylu znaków dla krótkich fragmentów
+NUMBER_PATTERN = re.compile(r'\d+') # liczby (wymiary, pojemności, kody) tłumacz przenosi bez zmian
+CHECKPOINT_SUFFIX = ".checkpoint.sqlite" # punkt kontrolny obok pliku wynikowego, usuwany po udanym zakończeniu
+
+def packed_segments_match(texts, segments):
+    """
+    Sprawdza, czy linie odpowiedzi na połączoną paczkę odpowiadają wysłanym fragmentom: ta sama liczba,
+    żadna linia nie jest pusta, każda zawiera te same liczby co oryginał, a jej długość mieści się
+    w granicach PACKED_LENGTH_RATIO względem oryginału.
+    Przesunięte linie (np. gdy tłumacz połączył dwa fragmenty i rozdzielił inny) nie mogą trafić do pamięci tłumaczeń.
+    """
+    if len(segments) != len(texts):
+        return False
+    for text, segment in zip(texts, segments):
+        source_length, translated_length = len(text.strip()), len(segment)
+        if not segment or sorted(NUMBER_PATTERN.findall(text)) != sorted(NUMBER_PATTERN.findall(segment)):
+            return False
+        if translated_length > source_length * PACKED_LENGTH_RATIO + PACKED_LENGTH_SLACK:
+            return False
+        if source_length > translated_length * PACKED_LENGTH_RATIO + PACKED_LENGTH_SLACK:
+            return False
+    return True
+
+def checkpoint_path_for(output_path, memory_engine):
+    """Ścieżka punktu kontrolnego dla pliku wynikowego i silnika (np. 'wynik.csv.openai_gpt-4o-mini.checkpoint.sqlite')."""
+    engine_label = re.sub(r'[^\w.-]+', '_', memory_engine)
+    return f"{output_path}.{engine_label}{CHECKPOINT_SUFFIX}"
+
+def remove_checkpoint(checkpoint_path):
+    """Usuwa plik punktu kontrolnego razem z plikami pomocniczymi SQLite."""
+    for path in (checkpoint_path, f"{checkpoint_path}-wal", f"{checkpoint_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def build_batches(fragments, character_limit, separator_length=len(PACKED_SEPARATOR), max_items=None):
+    """
+    Pakuje fragmenty metodą "best fit decreasing" (od najdłuższych, każdy do paczki z najmniejszym wystarczającym
+    wolnym miejscem), tak aby paczki z separatorami były jak najbliżej limitu znaków (i nie miały więcej niż `max_items` tekstów).
+    Fragmenty zawierające separator trafiają do osobnych paczek, a puste fragmenty są pomijane.
+    """
+    batches, free_space = [], []  # free_space: posortowana lista (wolne miejsce, numer paczki)
+    for fragment in sorted(fragments, key=lambda f: len(f['text']), reverse=True):
+        text = fragment['text']
+        if not text.strip():
+            continue
+        if PACKED_SEPARATOR in text:
+            batches.append([fragment])
+            continue
+        needed = len(text) + separator_length
+        pos = bisect.bisect_left(free_space, (needed, -1))
+        if pos < len(free_space):
+            space, batch_idx = free_space.pop(pos)
+            batches[batch_idx].append(fragment)
+            if not max_items or len(batches[batch_idx]) < max_items:
+                bisect.insort(free_space, (space - needed, batch_idx))
+        else:
+            batches.append([fragment])
+            if max_items != 1:
+                bisect.insort(free_space, (character_limit - len(text), len(batches) - 1))
+    return batches
 
 class TranslationWorker(QObject):
     progress = pyqtSignal(int)
@@ -53,12 +108,14 @@ class TranslationWorker(QObject):
     cooldown_started = pyqtSignal(int)
     cooldown_finished = pyqtSignal()
 
-    def __init__(self, parent_dialog, source_lang, target_lang, columns_to_translate, num_workers, requests_per_sec, input_csv_path, is_diagnostic_mode, id_column, is_patch_mode=False):
+    def __init__(self, parent_dialog, source_lang, target_lang, columns_to_translate, num_workers, requests_per_sec, input_csv_path, is_diagnostic_mode, id_column, is_patch_mode=False, use_translation_memory=True, is_streaming_mode=False, backend_name='google', backend_options=None):
         super().__init__()
         self.d = parent_dialog
         self.global_cooldown_lock = threading.Lock()
         self.source_lang = source_lang
-        self.target_lang = target_lang
+        # Jeden kod języka albo lista kodów - fragmenty są wyodrębniane raz i tłumaczone na wszystkie języki
+        self.target_langs = [target_lang] if isinstance(target_lang, str) else list(dict.fromkeys(target_lang))
+        self.target_lang = self.target_langs[0]
         self.columns_to_translate = columns_to_translate
         self.num_workers = num_workers
         self.requests_per_sec = requests_per_sec
@@ -66,42 +123,39 @@ class TranslationWorker(QObject):
         self.is_diagnostic_mode = is_diagnostic_mode
         self.id_column = id_column
         self.is_patch_mode = is_patch_mode
+        self.use_translation_memory = use_translation_memory
+        self.is_streaming_mode = is_streaming_mode
+        self.backend_name = backend_name
+        self.backend_options = backend_options or {}
+        self.backend_class = get_backend_class(backend_name)
+        self.translation_memory = None
+        self.checkpoint = None
+        self.is_resuming = False
+        self.packing_enabled = True
+        self.packing_mismatches = 0
+        self.packing_lock = threading.Lock()
+        self.process_pool = None
+        self.limiter = None
         self.translation_errors = []
         self.error_lock = threading.Lock()
         self.is_cancelled = False
 
 
-    def translation_worker_thread(self, worker_id, fragment_chunks, source, target, limiter, results):
-        self.log_info.emit(f"[Wątek {worker_id}] Start: {len(fragment_chunks)} fragmentów.")
-        translated, translator = [], GoogleTranslator(source=source, target=target)
-        batch_fragments, batch_texts, chars, total, processed = [], [], 0, len(fragment_chunks), 0
-        chunk_idx = 0
-        
-        while chunk_idx < len(fragment_chunks):
-            if self.is_cancelled:
-                self.log_info.emit(f"[Wątek {worker_id}] Anulowano.")
-                break
+    def translation_worker_thread(self, worker_id, work_queue, source, limiter, results):
+        self.log_info.emit(f"[Wątek {worker_id}] Start.")
+        translators = {}  # silnik dla każdego języka docelowego, tworzony przy pierwszej paczce w tym języku
+        processed_batches = 0
 
-            fragment = fragment_chunks[chunk_idx]
-            text_chunk = fragment['text']
-
-            if not text_chunk or not text_chunk.strip():
-                batch_fragments.append(fragment)
-                batch_texts.append(' ')
-                chunk_idx += 1
-                continue
-            
-            if chars + len(text_chunk) > CHARACTER_LIMIT and batch_texts:
-                pass
-            else:
-                batch_fragments.append(fragment)
-                batch_texts.append(text_chunk)
-                chars += len(text_chunk)
-                chunk_idx += 1
+        while not self.is_cancelled:
+            try:
+                target, batch_idx, batch_fragments = work_queue.get_nowait()
+            except queue.Empty:
+                break
+            if target not in translators:
+                translators[target] = create_backend(self.backend_name, source, target, **self.backend_options)
+            translator = translators[target]
+            batch_texts = [fragment['text'] for fragment in batch_fragments]
 
-            if chunk_idx < len(fragment_chunks) and (chars + len(fragment_chunks[chunk_idx]['text']) <= CHARACTER_LIMIT):
-                continue
-            
             is_successful, retries = False, 0
             while not is_successful:
                 if self.is_cancelled: break
@@ -110,14 +164,15 @@ class TranslationWorker(QObject):
 
                 limiter.wait()
                 try:
-                    t_batch = translator.translate_batch(batch_texts)
+                    t_batch = self.translate_packed(translator, batch_texts, limiter, worker_id)
                     safe_t_batch = [t if t is not None else o for o, t in zip(batch_texts, t_batch)]
-                    translated.extend(safe_t_batch)
-                    processed += len(batch_texts)
-                    self.log_info.emit(f"[Wątek {worker_id}] OK: {len(batch_texts)} frag. ({processed}/{total})")
+                    self.remember_translations(zip(batch_texts, t_batch), target)
+                    results[(target, batch_idx)] = safe_t_batch
+                    processed_batches += 1
+                    self.log_info.emit(f"[Wątek {worker_id}] OK: {len(batch_texts)} frag. ({target.upper()}, paczka {batch_idx + 1}, pozostało w kolejce: {work_queue.qsize()})")
                     is_successful = True
                 except Exception as e:
-                    if "too many requests" in str(e).lower():
+                    if isinstance(e, RateLimitError) or "too many requests" in str(e).lower():
                         retries += 1
                         if retries >= ACTIVATE_COOLDOWN_AFTER_RETRIES:
                             if self.global_cooldown_lock.acquire(blocking=False):
@@ -145,178 +200,345 @@ class TranslationWorker(QObject):
                                 limiter.wait()
                                 translated_text = translator.translate(text_to_translate)
                                 fallback_translated.append(translated_text if translated_text else text_to_translate)
+                                self.remember_translations([(text_to_translate, translated_text)], target)
                             except Exception as single_e:
                                 self.log_error.emit(f"[Wątek {worker_id}] Błąd pojedynczego tłumaczenia: {single_e}. Używam oryginału.")
                                 fallback_translated.append(text_to_translate)
                                 with self.error_lock:
-                                    frag = batch_fragments[i]
-                                    self.translation_errors.append({
-                                        'product_id': frag['product_id'],
-                                        'column': frag['col_name'],
-                                        'original_content': frag['original_cell_content']
-                                    })
+                                    for frag in batch_fragments[i]['occurrences']:
+                                        self.translation_errors.append({
+                                            'product_id': frag['product_id'],
+                                            'column': frag['col_name'],
+                                            'language': target,
+                                            'loc': frag['loc']
+                                        })
                         
-                        translated.extend(fallback_translated)
+                        results[(target, batch_idx)] = fallback_translated
+                        processed_batches += 1
                         is_successful = True
             
-            self.progress.emit(len(batch_texts))
-            batch_fragments, batch_texts, chars = [], [], 0
-        results[worker_id] = translated
-        self.log_info.emit(f"[Wątek {worker_id}] Koniec.")
+            if is_successful:
+                self.progress.emit(sum(len(frag['occurrences']) for frag in batch_fragments))
+        if self.is_cancelled:
+            self.log_info.emit(f"[Wątek {worker_id}] Anulowano.")
+        self.log_info.emit(f"[Wątek {worker_id}] Koniec. Przetłumaczone paczki: {processed_batches}.")
+
+    def translate_packed(self, translator, texts, limiter, worker_id):
+        """
+        Tłumaczy paczkę jednym zapytaniem. Silniki z natywnym tłumaczeniem list dostają listę tekstów, a pozostałe
+        (Google) - teksty połączone separatorem. Jeśli linie odpowiedzi nie pasują do fragmentów (packed_segments_match),
+        teksty są tłumaczone osobno, a po PACKING_MISMATCH_LIMIT takich przypadkach łączenie jest wyłączane.
+        """
+        if not self.backend_class.supports_packing:
+            return translator.translate_batch(texts)
+        if len(texts) > 1 and self.packing_enabled:
+            translated = translator.translate(PACKED_SEPARATOR.join(texts))
+            lines = [line.strip() for line in translated.split(PACKED_SEPARATOR)] if translated else []
+            if packed_segments_match(texts, lines):
+                return lines
+            with self.packing_lock:
+                self.packing_mismatches += 1
+                if self.packing_mismatches >= PACKING_MISMATCH_LIMIT and self.packing_enabled:
+                    self.packing_enabled = False
+                    self.log_error.emit(f"Tłumacz {PACKING_MISMATCH_LIMIT} razy zwrócił linie niepasujące do wysłanych fragmentów. Wyłączam łączenie fragmentów w jedno zapytanie.")
+            if len(lines) != len(texts):
+                self.log_info.emit(f"[Wątek {worker_id}] Niezgodna liczba linii w odpowiedzi ({len(lines)} zamiast {len(texts)}). Tłumaczę fragmenty osobno...")
+            else:
+                self.log_info.emit(f"[Wątek {worker_id}] Linie odpowiedzi nie pasują do fragmentów (pusta linia lub niezgodna długość). Tłumaczę fragmenty osobno...")
+            limiter.wait()
+
+        translated_texts = []
+        for i, text in enumerate(texts):
+            if i: limiter.wait()
+            translated_texts.append(translator.translate(text))
+        return translated_texts
+
+    def remember_translations(self, pairs, target):
+        """Zapisuje udane tłumaczenia na język `target` w punkcie kontrolnym i w pamięci tłumaczeń (jeśli jest włączona)."""
+        pairs = list(pairs)
+        for store in (self.checkpoint, self.translation_memory):
+            if not store: continue
+            try:
+                store.put_many(self.source_lang, target, pairs)
+            except Exception as e:
+                self.log_error.emit(f"Nie udało się zapisać tłumaczeń w pliku '{store.path}': {e}")
+
+    def fill_from_store(self, store, label, fragments, translated_texts_stripped, target):
+        """Uzupełnia brakujące tłumaczenia na język `target` z punktu kontrolnego lub pamięci tłumaczeń. Zwraca liczbę trafień."""
+        missing = [frag['text'] for idx, frag in enumerate(fragments) if translated_texts_stripped[idx] is None]
+        known_translations = store.get_many(self.source_lang, target, missing)
+        hits = 0
+        for idx, frag in enumerate(fragments):
+            if translated_texts_stripped[idx] is None and frag['text'] in known_translations:
+                translated_texts_stripped[idx] = known_translations[frag['text']]
+                hits += 1
+        self.log_info.emit(f"{label} ({target.upper()}): {hits} z {len(fragments)} fragmentów przetłumaczono wcześniej.")
+        if hits:
+            self.progress.emit(hits)
+        return hits
+
+    def translate_frame(self, df, successful_patches, target_langs=None):
+        """
+        Tłumaczy wybrane kolumny w ramce danych (cały plik albo jedna paczka wierszy w trybie strumieniowym)
+        na wszystkie języki docelowe. HTML jest parsowany raz, niezależnie od liczby języków.
+        Zwraca słownik {język: przetłumaczona ramka} (przy jednym języku jest to `df` zmieniony w miejscu;
+        w trybie poprawek wyniki trafiają do `successful_patches`) albo pusty słownik, jeśli nie było nic do tłumaczenia.
+        """
+        cells_to_process = []
+        all_fragments_to_translate = []
+        whitespace_map = []
+        errors_before = len(self.translation_errors)
+
+        # Komórki do przetworzenia w stałej kolejności: kolumna po kolumnie, wiersz po wierszu
+        cell_tasks = []
+        for col in self.columns_to_translate:
+            if col not in df.columns: continue
+            for i, original_content, product_id in zip(df.index, df[col], df[self.id_column]):
+                if str(original_content).strip():
+                    cell_tasks.append((i, col, product_id))
+
+        # Parsowanie HTML w puli procesów; wyniki wracają w kolejności komórek
+        task_ptr = 0
+        cell_contents = [str(df.at[i, col]) for i, col, _ in cell_tasks]
+        for extracted_chunk in process_in_chunks(extract_cells, cell_contents, self.backend_class.character_limit, executor=self.process_pool):
+            if self.is_cancelled: break
+            for cell in extracted_chunk:
+                i, col, product_id = cell_tasks[task_ptr]
+                task_ptr += 1
+                if not cell: continue
+                if cell['split_nodes']:
+                    self.log_info.emit(f"Wykryto fragment > {self.backend_class.character_limit} znaków (ID: {product_id}, Kol: {col}). Dzielenie na zdania...")
+
+                node_counts = []
+                for node_parts in cell['nodes']:
+                    node_counts.append(len(node_parts))
+                    for text, has_leading, has_trailing in node_parts:
+                        whitespace_map.append({'leading': has_leading, 'trailing': has_trailing})
+                        # Fragment trzyma tylko położenie komórki - oryginalna treść zostaje w ramce danych
+                        all_fragments_to_translate.append({'text': text, 'product_id': product_id, 'col_name': col, 'loc': (i, col)})
+                cells_to_process.append({
+                    'loc': (i, col), 'is_html': cell['is_html'], 'template': cell['template'], 'node_counts': node_counts,
+                    'count': sum(node_counts), 'product_id': product_id, 'col_name': col
+                })
+        del cell_contents
+
+        if self.is_cancelled: raise InterruptedError("Proces anulowany przez użytkownika.")
+        if not all_fragments_to_translate:
+            return {}
+
+        target_langs = target_langs or self.target_langs
+        self.d.total_chunks_to_process += len(all_fragments_to_translate) * len(target_langs)
+        self.log_info.emit(f"Znaleziono {len(cells_to_process)} komórek, łącznie {len(all_fragments_to_translate)} fragmentów do tłumaczenia (po podziale).")
+
+        # Dla każdego języka osobno: uzupełnienie ze znanych tłumaczeń, deduplikacja i podział na paczki
+        translated_by_lang, batches_by_lang = {}, {}
+        for frag_idx, frag in enumerate(all_fragments_to_translate):
+            frag['idx'] = frag_idx
+        for target in target_langs:
+            # Fragmenty przetłumaczone przed przerwaniem tego zadania (punkt kontrolny) lub we wcześniejszych uruchomieniach (pamięć tłumaczeń)
+            translated_texts_stripped = [None] * len(all_fragments_to_translate)
+            if self.checkpoint and (self.is_resuming or self.is_streaming_mode):
+                self.fill_from_store(self.checkpoint, "Punkt kontrolny", all_fragments_to_translate, translated_texts_stripped, target)
+            if self.translation_memory:
+                self.fill_from_store(self.translation_memory, "Pamięć tłumaczeń", all_fragments_to_translate, translated_texts_stripped, target)
+
+            # Deduplikacja: każdy unikalny tekst jest tłumaczony raz, a wynik trafia do wszystkich jego wystąpień
+            unique_fragments = {}
+            for idx, frag in enumerate(all_fragments_to_translate):
+                if translated_texts_stripped[idx] is not None:
+                    continue
+                unique_fragments.setdefault(frag['text'], {'text': frag['text'], 'occurrences': []})['occurrences'].append(frag)
+            fragments_to_send = list(unique_fragments.values())
+
+            pending_occurrences = sum(len(unit['occurrences']) for unit in fragments_to_send)
+            if pending_occurrences:
+                unique_chars = sum(len(unit['text']) for unit in fragments_to_send)
+                total_chars = sum(len(unit['text']) * len(unit['occurrences']) for unit in fragments_to_send)
+                saved_percent = 100 * (1 - unique_chars / total_chars) if total_chars else 0
+                self.log_info.emit(f"Deduplikacja ({target.upper()}): {len(fragments_to_send)} unikalnych tekstów dla {pending_occurrences} fragmentów ({saved_percent:.0f}% mniej znaków do wysłania).")
+
+            # Puste fragmenty nie wymagają tłumaczenia - zostają bez zmian
+            for unit in fragments_to_send:
+                if not unit['text'].strip():
+                    for frag in unit['occurrences']:
+                        translated_texts_stripped[frag['idx']] = unit['text']
+
+            batches = build_batches(
+                fragments_to_send, self.backend_class.character_limit,
+                separator_length=len(PACKED_SEPARATOR) if self.backend_class.supports_packing else 0,
+                max_items=self.backend_class.max_batch_items
+            )
+            if batches:
+                self.log_info.emit(f"Spakowano {sum(len(batch) for batch in batches)} tekstów ({target.upper()}) w {len(batches)} zapytań (średnio {sum(len(unit['text']) for batch in batches for unit in batch) / len(batches):.0f} znaków na zapytanie).")
+            translated_by_lang[target] = translated_texts_stripped
+            batches_by_lang[target] = batches
+
+        # Wspólna kolejka paczek wszystkich języków, na przemian - wątki tłumaczą kilka języków jednocześnie
+        work_queue = queue.Queue()
+        language_batches = [[(target, batch_idx, batch) for batch_idx, batch in enumerate(batches_by_lang[target])] for target in target_langs]
+        for round_batches in zip_longest(*language_batches):
+            for item in round_batches:
+                if item: work_queue.put(item)
+        total_batches = work_queue.qsize()
+
+        threads, results = [], {}
+        for worker_id in range(min(max(self.num_workers, 1), total_batches)):
+            thread = threading.Thread(target=self.translation_worker_thread, args=(worker_id, work_queue, self.source_lang, self.limiter, results))
+            threads.append(thread)
+            thread.start()
+        for thread in threads: thread.join()
+
+        if self.is_cancelled: raise InterruptedError("Proces anulowany przez użytkownika.")
+
+        for target in target_langs:
+            for batch_idx, batch in enumerate(batches_by_lang[target]):
+                for unit, text in zip(batch, results.get((target, batch_idx), [])):
+                    for frag in unit['occurrences']:
+                        translated_by_lang[target][frag['idx']] = text
+
+        # Treść komórek z błędami uzupełniamy z ramki danych, póki jest jeszcze w pamięci
+        new_errors = self.translation_errors[errors_before:]
+        for error in new_errors:
+            error['original_content'] = df.at[error.pop('loc')]
+
+        translated_frames = {}
+        for target in target_langs:
+            translated_texts = [f"{(' ' if ws['leading'] else '')}{text}{(' ' if ws['trailing'] else '')}" for text, ws in zip(translated_by_lang.pop(target), whitespace_map)]
+
+            text_ptr = 0
+            original_error_ids = {(err['product_id'], err['column']) for err in new_errors if err['language'] == target}
+
+            cells_to_assemble, assemble_jobs = [], []
+            for cell_info in cells_to_process:
+                translated_parts = translated_texts[text_ptr : text_ptr + cell_info['count']]
+                text_ptr += cell_info['count']
+
+                if (cell_info['product_id'], cell_info['col_name']) in original_error_ids:
+                    continue
+
+                cells_to_assemble.append(cell_info)
+                # Oryginał jest potrzebny tylko wtedy, gdy komórka nie ma szablonu
+                original = str(df.at[cell_info['loc']]) if cell_info['is_html'] and cell_info['template'] is None else ""
+                assemble_jobs.append((cell_info['is_html'], cell_info['template'], cell_info['node_counts'], translated_parts, original))
+            del translated_texts
+
+            # Przy jednym języku komórki są podmieniane w miejscu, przy kilku każdy język dostaje własną kopię ramki
+            frame = None if self.is_patch_mode else (df if len(target_langs) == 1 else df.copy())
+            cell_ptr = 0
+            for assembled_chunk in process_in_chunks(assemble_cells, assemble_jobs, executor=self.process_pool):
+                for new_content in assembled_chunk:
+                    cell_info = cells_to_assemble[cell_ptr]
+                    cell_ptr += 1
+                    if self.is_patch_mode:
+                        successful_patches.append({'product_id': cell_info['product_id'], 'column': cell_info['col_name'], 'language': target, 'new_content': new_content})
+                    else:
+                        frame.at[cell_info['loc']] = new_content
+            translated_frames[target] = frame
+        return translated_frames
 
     def run(self):
         start_time = time.time()
         output_result = ""
         try:
-            self.log_info.emit(f"--- Start tłumaczenia z '{self.source_lang.upper()}' na '{self.target_lang.upper()}' ---")
+            self.log_info.emit(f"--- Start tłumaczenia z '{self.source_lang.upper()}' na '{', '.join(lang.upper() for lang in self.target_langs)}' ---")
             if self.is_patch_mode:
                 self.log_info.emit("--- TRYB POPRAWEK AKTYWNY ---")
 
-            df = pd.read_csv(self.input_csv_path, on_bad_lines='skip').fillna('')
-            
-            if self.id_column not in df.columns:
+            header = pd.read_csv(self.input_csv_path, nrows=0, on_bad_lines='skip').columns
+            if self.id_column not in header:
                 self.log_error.emit(f"Błąd krytyczny: Podana kolumna ID '{self.id_column}' nie istnieje w pliku CSV.")
                 raise FileNotFoundError(f"Missing ID column: {self.id_column}")
 
-            cells_to_process = []
-            all_fragments_to_translate = []
-            whitespace_map = []
-
-            for col in self.columns_to_translate:
-                if self.is_cancelled: break
-                if col not in df.columns: continue
-                for i, row in df.iterrows():
-                    if self.is_cancelled: break
-                    original_content = row[col]
-                    cell_content_str = str(original_content)
-                    product_id = row[self.id_column]
-
-                    if not cell_content_str.strip(): continue
-
-                    texts_for_this_cell = []
-                    soup = BeautifulSoup(cell_content_str, "html.parser")
-                    nodes_to_process = soup.find_all(string=True)
-                    
-                    for node in nodes_to_process:
-                        if self.is_cancelled: break
-                        if node.parent.name in ['style', 'script', 'head', 'title', 'meta'] or not node.strip(): continue
-                        
-                        original_text_node = str(node)
-                        
-                        if len(original_text_node) > CHARACTER_LIMIT:
-                            self.log_info.emit(f"Wykryto fragment > {CHARACTER_LIMIT} znaków (ID: {product_id}, Kol: {col}). Dzielenie na zdania...")
-                            sentences = re.split(r'(?<=[.!?])\s+', original_text_node)
-                            
-                            sub_fragments = []
-                            current_chunk = ""
-                            for sentence in sentences:
-                                if len(current_chunk) + len(sentence) + 1 > CHARACTER_LIMIT:
-                                    if current_chunk: sub_fragments.append(current_chunk)
-                                    current_chunk = sentence
-                                else:
-                                    current_chunk = f"{current_chunk} {sentence}" if current_chunk else sentence
-                            if current_chunk: sub_fragments.append(current_chunk)
-
-                            for sub_frag_text in sub_fragments:
-                                has_leading = sub_frag_text.startswith(' ')
-                                has_trailing = sub_frag_text.endswith(' ')
-                                whitespace_map.append({'leading': has_leading, 'trailing': has_trailing})
-                                fragment_info = {
-                                    'text': sub_frag_text.strip(), 'product_id': product_id,
-                                    'original_cell_content': original_content, 'col_name': col
-                                }
-                                texts_for_this_cell.append(fragment_info)
-                        else:
-                            has_leading = original_text_node.startswith(' ')
-                            has_trailing = original_text_node.endswith(' ')
-                            whitespace_map.append({'leading': has_leading, 'trailing': has_trailing})
-                            fragment_info = {
-                                'text': original_text_node.strip(), 'product_id': product_id,
-                                'original_cell_content': original_content, 'col_name': col
-                            }
-                            texts_for_this_cell.append(fragment_info)
-
-                    if not self.is_cancelled and texts_for_this_cell:
-                        is_html = bool(BeautifulSoup(original_content, "html.parser").find())
-                        cells_to_process.append({'loc': (i, col), 'is_html': is_html, 'count': len(texts_for_this_cell), 'product_id': product_id, 'col_name': col})
-                        all_fragments_to_translate.extend(texts_for_this_cell)
-
-                if self.is_cancelled: break
-
-            if self.is_cancelled: raise InterruptedError("Proces anulowany przez użytkownika.")
-            if not all_fragments_to_translate:
-                self.log_info.emit("Nie znaleziono żadnych tekstów do tłumaczenia.")
-                raise InterruptedError("Brak tekstów.")
-
-            self.d.total_chunks_to_process = len(all_fragments_to_translate)
-            self.log_info.emit(f"Znaleziono {len(cells_to_process)} komórek, łącznie {self.d.total_chunks_to_process} fragmentów do tłumaczenia (po podziale).")
-            
-            limiter = RateLimiter(self.requests_per_sec)
-            chunk_split = math.ceil(len(all_fragments_to_translate) / self.num_workers) if self.num_workers > 0 else len(all_fragments_to_translate)
-            chunk_groups = [all_fragments_to_translate[i:i + chunk_split] for i in range(0, len(all_fragments_to_translate), chunk_split)]
-
-            threads, results = [], [[] for _ in chunk_groups]
-            for i, group in enumerate(chunk_groups):
-                if not group: continue
-                thread = threading.Thread(target=self.translation_worker_thread, args=(i, group, self.source_lang, self.target_lang, limiter, results))
-                threads.append(thread)
-                thread.start()
-            for thread in threads: thread.join()
-
-            if self.is_cancelled: raise InterruptedError("Proces anulowany przez użytkownika.")
-            
-            translated_texts_stripped = [chunk for res_list in results for chunk in res_list]
-            
-            translated_texts = [f"{(' ' if ws['leading'] else '')}{text}{(' ' if ws['trailing'] else '')}" for text, ws in zip(translated_texts_stripped, whitespace_map)]
+            self.d.total_chunks_to_process = 0
+            self.limiter = RateLimiter(self.requests_per_sec)
+            self.process_pool = create_process_pool()
+            self.log_info.emit(f"Silnik tłumaczeń: {self.backend_class.label}")
+            # Wyniki silnika testowego nie mogą trafić do pamięci tłumaczeń ani do punktu kontrolnego
+            memory_engine = self.backend_class.memory_engine(**self.backend_options)
+            if self.use_translation_memory and self.backend_class.cacheable:
+                self.translation_memory = TranslationMemory(TRANSLATION_MEMORY_FILE, memory_engine)
 
-            text_ptr = 0
             successful_patches = []
-            
-            original_error_ids = { (err['product_id'], err['column']) for err in self.translation_errors }
-
-            for cell_info in cells_to_process:
-                is_error_cell = False
-                fragments_for_this_cell = all_fragments_to_translate[text_ptr : text_ptr + cell_info['count']]
-                if any((frag['product_id'], frag['col_name']) in original_error_ids for frag in fragments_for_this_cell):
-                    is_error_cell = True
-
-                translated_parts = translated_texts[text_ptr : text_ptr + cell_info['count']]
-                text_ptr += cell_info['count']
-
-                if is_error_cell:
-                    continue
-                
-                if cell_info['is_html']:
-                    new_soup = BeautifulSoup(str(df.iloc[cell_info['loc'][0]][cell_info['loc'][1]]), 'html.parser')
-                    
-                    text_nodes_in_soup = [node for node in new_soup.find_all(string=True) if node.parent.name not in ['style', 'script', 'head', 'title', 'meta'] and node.strip()]
-                    
-                    for i, node in enumerate(text_nodes_in_soup):
-                        if i < len(translated_parts):
-                            node.replace_with(translated_parts[i])
-                    new_content = str(new_soup)
+            base, ext = os.path.splitext(os.path.basename(self.input_csv_path))
+            output_dir = os.path.dirname(self.input_csv_path)
+            output_path = os.path.join(output_dir, f"{base}_translated{ext}")
+            # Przy kilku językach każdy dostaje własny plik wynikowy
+            output_paths = {self.target_lang: output_path} if len(self.target_langs) == 1 else {
+                lang: os.path.join(output_dir, f"{base}_translated_{lang}{ext}") for lang in self.target_langs
+            }
+
+            # Każda przetłumaczona paczka trafia do punktu kontrolnego, więc przerwane zadanie można wznowić bez ponownego tłumaczenia.
+            # Tłumaczenia są w nim zapisane osobno dla każdego języka, więc jeden plik obsługuje wszystkie języki;
+            # każdy silnik i model ma własny plik, więc wznowienie innym silnikiem nie użyje cudzych tłumaczeń.
+            checkpoint_path = checkpoint_path_for(output_path, memory_engine)
+            self.is_resuming = self.backend_class.cacheable and os.path.exists(checkpoint_path)
+            if self.backend_class.cacheable:
+                self.checkpoint = TranslationMemory(checkpoint_path, memory_engine)
+            if self.is_resuming:
+                resumed = sum(self.checkpoint.count(self.source_lang, lang) for lang in self.target_langs)
+                self.log_info.emit(f"Wznawianie przerwanego zadania: punkt kontrolny zawiera {resumed} przetłumaczonych fragmentów.")
+
+            # Plik poprawek jest mały, więc zawsze wczytujemy go w całości
+            if self.is_streaming_mode and not self.is_patch_mode:
+                self.log_info.emit(f"Tryb strumieniowy: plik jest przetwarzany w paczkach po {STREAM_CHUNK_ROWS} wierszy.")
+                found_texts = False
+                with contextlib.ExitStack() as stack:
+                    output_files = {lang: stack.enter_context(open(path, 'w', encoding='utf-8-sig', newline='')) for lang, path in output_paths.items()}
+                    for chunk_number, chunk_df in enumerate(pd.read_csv(self.input_csv_path, on_bad_lines='skip', chunksize=STREAM_CHUNK_ROWS)):
+                        if self.is_cancelled: raise InterruptedError("Proces anulowany przez użytkownika.")
+                        chunk_df = chunk_df.fillna('')
+                        self.log_info.emit(f"--- Paczka wierszy {chunk_number + 1} (wiersze {chunk_df.index[0] + 1}-{chunk_df.index[-1] + 1}) ---")
+                        translated_frames = self.translate_frame(chunk_df, successful_patches)
+                        found_texts = found_texts or bool(translated_frames)
+                        for lang, output_file in output_files.items():
+                            translated_frames.get(lang, chunk_df).to_csv(output_file, header=(chunk_number == 0), index=False)
+                        del translated_frames
+                if not found_texts:
+                    for path in output_paths.values():
+                        os.remove(path)
+                    self.log_info.emit("Nie znaleziono żadnych tekstów do tłumaczenia.")
+                    raise InterruptedError("Brak tekstów.")
+                output_result = output_path if len(output_paths) == 1 else output_paths
+            elif self.is_patch_mode:
+                df = pd.read_csv(self.input_csv_path, on_bad_lines='skip').fillna('')
+                # Plik błędów zawiera język każdej komórki - poprawiamy tylko te języki, w których wystąpił błąd
+                if 'language' in df.columns:
+                    frames_by_lang = [(lang, group) for lang, group in df.groupby('language', sort=False)]
                 else:
-                    new_content = "".join(translated_parts)
-                
-                if self.is_patch_mode:
-                    successful_patches.append({'product_id': cell_info['product_id'], 'column': cell_info['col_name'], 'new_content': new_content})
-                else:
-                    df.at[cell_info['loc']] = new_content
-
-            if self.is_patch_mode:
+                    frames_by_lang = [(None, df)]
+                found_texts = False
+                for lang, frame in frames_by_lang:
+                    found_texts = bool(self.translate_frame(frame, successful_patches, [lang] if lang else None)) or found_texts
+                if not found_texts:
+                    self.log_info.emit("Nie znaleziono żadnych tekstów do tłumaczenia.")
+                    raise InterruptedError("Brak tekstów.")
                 output_result = successful_patches
             else:
-                base, ext = os.path.splitext(os.path.basename(self.input_csv_path))
-                output_path = os.path.join(os.path.dirname(self.input_csv_path), f"{base}_translated{ext}")
-                df.to_csv(output_path, index=False, encoding='utf-8-sig')
-                output_result = output_path
-
+                df = pd.read_csv(self.input_csv_path, on_bad_lines='skip').fillna('')
+                translated_frames = self.translate_frame(df, successful_patches)
+                if not translated_frames:
+                    self.log_info.emit("Nie znaleziono żadnych tekstów do tłumaczenia.")
+                    raise InterruptedError("Brak tekstów.")
+
+                for lang, path in output_paths.items():
+                    translated_frames.pop(lang).to_csv(path, index=False, encoding='utf-8-sig')
+                output_result = output_path if len(output_paths) == 1 else output_paths
+
+            # Zadanie zakończone - punkt kontrolny nie jest już potrzebny
+            if self.checkpoint:
+                self.checkpoint.close()
+                self.checkpoint = None
+                remove_checkpoint(checkpoint_path)
+
+            error_output_path = os.path.join(os.path.dirname(self.input_csv_path), "translator_errors.csv")
             if self.translation_errors:
-                error_df = pd.DataFrame(self.translation_errors).drop_duplicates(subset=['product_id', 'column'])
-                error_output_path = os.path.join(os.path.dirname(self.input_csv_path), "translator_errors.csv")
+                error_df = pd.DataFrame(self.translation_errors).drop_duplicates(subset=['product_id', 'column', 'language'])
                 if not error_df.empty:
                     error_df.to_csv(error_output_path, index=False, encoding='utf-8-sig')
                     self.log_info.emit(f"Zapisano {len(error_df)} unikalnych błędów w pliku: {error_output_path}")
+            elif os.path.exists(error_output_path):
+                # Przebieg bez błędów - plik z poprzedniego przebiegu nie może trafić do ponownego przetwarzania
+                os.remove(error_output_path)
 
         except (InterruptedError, FileNotFoundError) as e:
             self.log_info.emit(str(e))
@@ -324,6 +546,17 @@ class TranslationWorker(QObject):
             self.log_error.emit(f"BŁĄD KRYTYCZNY w głównym wątku: {e}")
             self.log_error.emit(traceback.format_exc())
         finally:
+            if self.process_pool:
+                self.process_pool.shutdown(cancel_futures=True)
+            if self.translation_memory:
+                self.translation_memory.close()
+            if self.checkpoint:
+                has_progress = any(self.checkpoint.count(self.source_lang, lang) > 0 for lang in self.target_langs)
+                self.checkpoint.close()
+                if has_progress:
+                    self.log_info.emit(f"Postęp zapisano w punkcie kontrolnym '{self.checkpoint.path}'. Uruchom tłumaczenie tego samego pliku ponownie, aby je wznowić.")
+                else:
+                    remove_checkpoint(self.checkpoint.path)
             total_time = time.time() - start_time
             self.finished.emit(output_result, total_time)
 
@@ -350,9 +583,15 @@ class TranslatorDialog(QDialog):
         settings.setValue("input_path", self.input_csv_path)
         settings.setValue("source_lang", self.source_lang_combo.currentText())
         settings.setValue("target_lang", self.target_lang_combo.currentText())
+        settings.setValue("extra_target_langs", self.extra_target_langs_input.text())
         settings.setValue("id_column", self.id_column_input.text())
         settings.setValue("num_workers", self.num_workers_input.text())
         settings.setValue("requests_per_sec", self.requests_per_sec_input.text())
+        settings.setValue("use_translation_memory", self.translation_memory_checkbox.isChecked())
+        settings.setValue("streaming_mode", self.streaming_checkbox.isChecked())
+        settings.setValue("backend", self.backend_combo.currentData())
+        settings.setValue("backend_base_url", self.backend_base_url_input.text())
+        settings.setValue("backend_model", self.backend_model_input.text())
         
         checked_columns = [col for col, cb in self.column_vars.items() if cb.isChecked()]
         settings.setValue("checked_columns", ",".join(checked_columns))
@@ -369,9 +608,17 @@ class TranslatorDialog(QDialog):
 
         self.source_lang_combo.setCurrentText(settings.value("source_lang", "Polski"))
         self.target_lang_combo.setCurrentText(settings.value("target_lang", "Angielski"))
+        self.extra_target_langs_input.setText(settings.value("extra_target_langs", ""))
         self.id_column_input.setText(settings.value("id_column", "ID"))
+        backend_index = self.backend_combo.findData(settings.value("backend", "google"))
+        self.backend_combo.setCurrentIndex(max(backend_index, 0))
+        self.update_backend_fields()
+        self.backend_base_url_input.setText(settings.value("backend_base_url", ""))
+        self.backend_model_input.setText(settings.value("backend_model", ""))
         self.num_workers_input.setText(settings.value("num_workers", "3"))
         self.requests_per_sec_input.setText(settings.value("requests_per_sec", "3.0"))
+        self.translation_memory_checkbox.setChecked(settings.value("use_translation_memory", True, type=bool))
+        self.streaming_checkbox.setChecked(settings.value("streaming_mode", False, type=bool))
 
     def initUI(self):
         main_layout = QVBoxLayout(self)
@@ -399,6 +646,13 @@ class TranslatorDialog(QDialog):
         lang_layout.addWidget(QLabel("Język docelowy:"))
         self.target_lang_combo = QComboBox()
         lang_layout.addWidget(self.target_lang_combo)
+        lang_layout.addWidget(QLabel("Dodatkowe języki:"))
+        self.extra_target_langs_input = QLineEdit()
+        self.extra_target_langs_input.setPlaceholderText("kody, np. de, cs, sk")
+        lang_layout.addWidget(self.extra_target_langs_input)
+        extra_langs_info_label = QLabel("ⓘ")
+        extra_langs_info_label.setToolTip("Kody kolejnych języków docelowych, oddzielone przecinkami.\nPlik jest analizowany tylko raz, a paczki wszystkich języków są tłumaczone jednocześnie.\nKażdy język trafia do osobnego pliku z końcówką \"_translated_<kod>\".")
+        lang_layout.addWidget(extra_langs_info_label)
         settings_layout.addLayout(lang_layout)
 
         id_col_layout = QHBoxLayout()
@@ -411,6 +665,28 @@ class TranslatorDialog(QDialog):
         id_col_layout.addStretch()
         settings_layout.addLayout(id_col_layout)
 
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Silnik tłumaczeń:"))
+        self.backend_combo = QComboBox()
+        for backend in BACKENDS.values():
+            self.backend_combo.addItem(backend.label, backend.name)
+        backend_layout.addWidget(self.backend_combo)
+        self.backend_api_key_input = QLineEdit()
+        self.backend_api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.backend_api_key_input.setPlaceholderText("Klucz API")
+        backend_layout.addWidget(self.backend_api_key_input)
+        self.backend_base_url_input = QLineEdit()
+        self.backend_base_url_input.setPlaceholderText("Adres API (opcjonalnie)")
+        backend_layout.addWidget(self.backend_base_url_input)
+        self.backend_model_input = QLineEdit()
+        self.backend_model_input.setPlaceholderText("Model (opcjonalnie)")
+        backend_layout.addWidget(self.backend_model_input)
+        backend_info_label = QLabel("ⓘ")
+        backend_info_label.setToolTip("Google - darmowy, jedno zapytanie na paczkę do ~4800 znaków.\nDeepL - wymaga klucza API (klucze darmowego planu kończą się na ':fx').\nOpenAI - również dowolny serwer zgodny z API OpenAI (podaj jego adres, np. http://localhost:8000/v1).\nOffline - nic nie tłumaczy; służy do testowania wydajności bez zużywania limitów.\nPo zmianie silnika limit zapytań/sek ustawia się na wartość zalecaną dla niego.")
+        backend_layout.addWidget(backend_info_label)
+        settings_layout.addLayout(backend_layout)
+        self.backend_combo.currentIndexChanged.connect(self.backend_changed)
+
         adv_layout = QVBoxLayout()
 
         threads_layout = QHBoxLayout()
@@ -437,6 +713,15 @@ class TranslatorDialog(QDialog):
 
         self.diagnostic_checkbox = QCheckBox("Uruchom w trybie diagnostycznym (generuj raport pominiętych komórek)")
         settings_layout.addWidget(self.diagnostic_checkbox)
+
+        self.translation_memory_checkbox = QCheckBox("Używaj pamięci tłumaczeń (nie tłumacz ponownie znanych fragmentów)")
+        self.translation_memory_checkbox.setChecked(True)
+        self.translation_memory_checkbox.setToolTip(f"Każdy przetłumaczony fragment jest zapisywany w pliku '{TRANSLATION_MEMORY_FILE}'.\nKolejne uruchomienia (np. po drobnych zmianach w katalogu) wysyłają do Google tylko nowe lub zmienione fragmenty.")
+        settings_layout.addWidget(self.translation_memory_checkbox)
+
+        self.streaming_checkbox = QCheckBox(f"Tryb strumieniowy dla dużych plików (paczki po {STREAM_CHUNK_ROWS} wierszy)")
+        self.streaming_checkbox.setToolTip("Plik jest wczytywany, tłumaczony i zapisywany partiami, więc zużycie pamięci nie zależy od jego rozmiaru.\nPowtórzenia między partiami są wychwytywane przez pamięć tłumaczeń, dlatego warto mieć ją włączoną.")
+        settings_layout.addWidget(self.streaming_checkbox)
         
         settings_group_box.setLayout(settings_layout)
         main_layout.addWidget(settings_group_box)
@@ -519,12 +804,23 @@ class TranslatorDialog(QDialog):
 
         self.controls_to_toggle = [
             self.select_file_button, self.load_columns_button, self.reprocess_button,
-            self.source_lang_combo, self.target_lang_combo, self.num_workers_input,
-            self.requests_per_sec_input, self.id_column_input
+            self.source_lang_combo, self.target_lang_combo, self.extra_target_langs_input, self.num_workers_input,
+            self.requests_per_sec_input, self.id_column_input, self.translation_memory_checkbox, self.streaming_checkbox,
+            self.backend_combo, self.backend_api_key_input, self.backend_base_url_input, self.backend_model_input
         ]
 
 
 
+    def backend_changed(self):
+        self.requests_per_sec_input.setText(str(get_backend_class(self.backend_combo.currentData()).requests_per_second))
+        self.update_backend_fields()
+
+    def update_backend_fields(self):
+        backend_class = get_backend_class(self.backend_combo.currentData())
+        self.backend_api_key_input.setEnabled(backend_class.name in ('deepl', 'openai'))
+        self.backend_base_url_input.setEnabled(backend_class.name in ('deepl', 'openai'))
+        self.backend_model_input.setEnabled(backend_class.name == 'openai')
+
     def prepare_language_list(self):
         try:
             full_lang_list = GoogleTranslator().get_supported_languages(as_dict=True)
@@ -619,6 +915,16 @@ class TranslatorDialog(QDialog):
         target_display = self.target_lang_combo.currentText()
         source = self.language_map_display[source_display]
         target = self.language_map_display[target_display]
+        targets = [target]
+        for code in re.split(r'[\s,;]+', self.extra_target_langs_input.text().strip().lower()):
+            if not code or code in targets: continue
+            if code not in self.language_map_display.values():
+                QMessageBox.critical(self, "Błąd", f"Nieznany kod języka docelowego: '{code}'.")
+                return
+            targets.append(code)
+        if source in targets:
+            QMessageBox.critical(self, "Błąd", "Język źródłowy nie może być jednocześnie językiem docelowym!")
+            return
         
         id_column = self.id_column_input.text().strip()
         if not id_column:
@@ -640,6 +946,17 @@ class TranslatorDialog(QDialog):
             return
 
         is_diagnostic_mode = self.diagnostic_checkbox.isChecked()
+        use_translation_memory = self.translation_memory_checkbox.isChecked()
+        is_streaming_mode = self.streaming_checkbox.isChecked()
+        backend_name = self.backend_combo.currentData()
+        backend_options = {
+            'api_key': self.backend_api_key_input.text().strip(),
+            'base_url': self.backend_base_url_input.text().strip(),
+            'model': self.backend_model_input.text().strip()
+        }
+        if get_backend_class(backend_name).requires_api_key and not backend_options['api_key']:
+            QMessageBox.critical(self, "Błąd", "Wybrany silnik tłumaczeń wymaga klucza API!")
+            return
 
         self.toggle_controls(False)
         self.progress_bar.setValue(0)
@@ -649,7 +966,7 @@ class TranslatorDialog(QDialog):
         self.start_time = time.time()
 
         self.thread = QThread()
-        self.worker = TranslationWorker(self, source, target, columns, num_workers, requests_per_sec, self.input_csv_path, is_diagnostic_mode, id_column, is_patch_mode)
+        self.worker = TranslationWorker(self, source, targets, columns, num_workers, requests_per_sec, self.input_csv_path, is_diagnostic_mode, id_column, is_patch_mode, use_translation_memory, is_streaming_mode, backend_name, backend_options)
         self.worker.moveToThread(self.thread)
 
         # Proper Qt thread management
@@ -696,32 +1013,36 @@ class TranslatorDialog(QDialog):
                 try:
                     settings = QSettings("IdoKombajn", "Translator")
                     last_output_path = settings.value("last_output_path", "")
+                    last_output_paths = json.loads(settings.value("last_output_paths", "{}") or "{}")
                     id_column = settings.value("id_column", "ID")
-                    if not last_output_path or not os.path.exists(last_output_path):
-                        self.log_error("Nie można znaleźć głównego pliku wynikowego do zaktualizowania!")
-                    else:
-                        df = pd.read_csv(last_output_path, on_bad_lines='skip', dtype={{id_column: str}}).fillna('')
-                        df.set_index(id_column, inplace=True)
-                        for patch in result:
-                            # Ensure product_id is treated as a string for lookup
-                            product_id_str = str(patch['product_id'])
-                            if product_id_str in df.index:
-                                df.loc[product_id_str, patch['column']] = patch['new_content']
-                            else:
-                                self.log_error(f"Nie znaleziono ID '{product_id_str}' w pliku wynikowym. Pomijanie poprawki.")
-                        
-                        df.reset_index(inplace=True)
-                        df.to_csv(last_output_path, index=False, encoding='utf-8-sig')
-                        self.log_info(f"✅ Pomyślnie zaktualizowano plik: {last_output_path}")
+                    patches_by_lang = {}
+                    for patch in result:
+                        patches_by_lang.setdefault(patch.get('language'), []).append(patch)
+                    for lang, patches in patches_by_lang.items():
+                        output_path = last_output_paths.get(lang, last_output_path)
+                        if not output_path or not os.path.exists(output_path):
+                            self.log_error(f"Nie można znaleźć głównego pliku wynikowego do zaktualizowania (język: {lang})!")
+                            continue
+                        summary = apply_translation_patches(output_path, patches, id_column)
+                        for col in summary['missing_columns']:
+                            self.log_error(f"Nie znaleziono kolumny '{col}' w pliku wynikowym. Pomijanie jej poprawek.")
+                        for product_id in summary['missing_ids']:
+                            self.log_error(f"Nie znaleziono ID '{product_id}' w pliku wynikowym. Pomijanie poprawki.")
+                        self.log_info(f"Zaktualizowano {summary['applied']} komórek.")
+                        self.log_info(f"✅ Pomyślnie zaktualizowano plik: {output_path}")
                 except Exception as e:
                     self.log_error(f"Nie udało się zaktualizować pliku wynikowego: {e}")
                     self.log_error(traceback.format_exc())
             self.status_label.setText(f"Zakończono poprawki. Czas: {self.format_time(total_time)}.")
-        elif isinstance(result, str) and result: # Normal run successful
+        elif result and isinstance(result, (str, dict)): # Normal run successful
+            # Przy kilku językach wynik to słownik {język: plik}; poprawki trafiają do pliku swojego języka
+            output_paths = result if isinstance(result, dict) else {self.worker.target_lang: result}
             self.log_info(f"--- ZAKOŃCZONO ---")
-            self.log_info(f"Wyniki zapisano w '{result}'.")
+            for lang, path in output_paths.items():
+                self.log_info(f"Wyniki ({lang.upper()}) zapisano w '{path}'.")
             settings = QSettings("IdoKombajn", "Translator")
-            settings.setValue("last_output_path", result)
+            settings.setValue("last_output_path", next(iter(output_paths.values())))
+            settings.setValue("last_output_paths", json.dumps(output_paths))
             self.status_label.setText(f"Zakończono! Czas: {self.format_time(total_time)}.")
         else: # Normal run with no texts or other issues
              self.log_info(f"--- ZAKOŃCZONO Z UWAGAMI ---")
@@ -769,6 +1090,7 @@ class TranslatorDialog(QDialog):
 
         if enabled:
             self.cancel_button.setEnabled(True)
+            self.update_backend_fields()
             if self.input_csv_path:
                 self.load_columns_button.setEnabled(True)
         else:
@@ -1,169 +1,264 @@
 
 import pandas as pd
 from bs4 import BeautifulSoup
-from deep_translator import GoogleTranslator
 import time
-import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import zip_longest
 import logging
+import random
+import re
+import os
+import html
+
+from .rate_limiter import RateLimiter
+from .translation_backends import RateLimitError, create_backend, get_backend_class
+from .translation_memory import TranslationMemory, TRANSLATION_MEMORY_FILE
 
 # Konfiguracja
 MAX_RETRIES = 5
 RETRY_DELAY = 30  # sekundy
-RATE_LIMIT = 1  # 1 zapytanie na sekundę
+RETRY_BASE_DELAY = 2  # sekundy; podwajane przy każdej próbie, maksymalnie do RETRY_MAX_DELAY
+RETRY_MAX_DELAY = RETRY_DELAY
+PER_TEXT_BATCHES_PER_SECOND = 1.0  # silniki tłumaczące paczkę tekst po tekście (Google): tempo startowe w paczkach na sekundę
+RATE_LIMIT_COOLDOWN = RETRY_DELAY  # po odrzuceniu z powodu limitu wszystkie wątki wstrzymują się na tyle sekund
+ROWS_PER_CHUNK = 5000  # wierszy wczytywanych i zapisywanych naraz
+TRANSLATED_ATTRIBUTES = ('alt', 'title')
+
+# Szybki skaner atrybutów: znacznik otwierający (wartości w cudzysłowach mogą zawierać '>') i kolejne atrybuty w nim
+TAG_PATTERN = re.compile(r'''<[a-zA-Z](?:[^>"']|"[^"]*"|'[^']*')*>''')
+TAG_NAME_PATTERN = re.compile(r'''<[a-zA-Z][^\s/>]*''')
+ATTRIBUTE_TOKEN_PATTERN = re.compile(r'''(\s+)([^\s"'>/=]+)(?:(\s*=\s*)("[^"]*"|'[^']*'|[^\s"'=<>`]+))?''')
+# Komentarze, skrypty i style mogą zawierać "znaczniki", których nie ma w dokumencie - takie opisy analizuje parser HTML
+NEEDS_PARSER_PATTERN = re.compile(r'<!--|<script|<style|<!\[CDATA\[', re.IGNORECASE)
+
+def scan_attributes(description):
+    """
+    Jednokrotnie skanuje opis i zwraca atrybuty alt/title do tłumaczenia:
+    {'values': [...], 'spans': [(początek, koniec), ...]} dla szybkiej ścieżki regex albo
+    {'values': [...], 'soup': ..., 'attributes': [(tag, nazwa), ...]} dla opisów wymagających parsera HTML.
+    Zwraca None, jeśli opis nie zawiera takich atrybutów.
+    """
+    if not isinstance(description, str) or not description.strip():
+        return None
+
+    if not NEEDS_PARSER_PATTERN.search(description):
+        values, spans = [], []
+        for tag_match in TAG_PATTERN.finditer(description):
+            pos = TAG_NAME_PATTERN.match(description, tag_match.start()).end()
+            while True:
+                attribute = ATTRIBUTE_TOKEN_PATTERN.match(description, pos, tag_match.end())
+                if not attribute:
+                    break
+                pos = attribute.end()
+                if attribute.group(2).lower() not in TRANSLATED_ATTRIBUTES or attribute.group(4) is None:
+                    continue
+                raw_value = attribute.group(4)
+                if raw_value[0] not in '"\'':
+                    values = None  # wartość bez cudzysłowu - rzadki przypadek, zostawiamy go parserowi
+                    break
+                values.append(html.unescape(raw_value[1:-1]))
+                spans.append((attribute.start(4) + 1, attribute.end(4) - 1))
+            if values is None:
+                break
+        if values is not None:
+            return {'values': values, 'spans': spans} if values else None
 
-class RateLimiter:
-    def __init__(self, rate_limit):
-        self.rate_limit = rate_limit
-        self.last_call = 0
-        self.lock = threading.Lock()
+    soup = BeautifulSoup(description, 'html.parser')
+    attributes = [(tag, name) for tag in soup.find_all(True) for name in TRANSLATED_ATTRIBUTES if tag.has_attr(name)]
+    if not attributes:
+        return None
+    return {'values': [tag[name] for tag, name in attributes], 'soup': soup, 'attributes': attributes}
 
-    def wait(self):
-        with self.lock:
-            elapsed = time.monotonic() - self.last_call
-            if elapsed < self.rate_limit:
-                time.sleep(self.rate_limit - elapsed)
-            self.last_call = time.monotonic()
+def rebuild_description(description, scanned, translated_texts):
+    """Wstawia tłumaczenia w miejsca zapisane przez `scan_attributes`; reszta opisu pozostaje bez zmian."""
+    if not scanned:
+        return description
+    if 'spans' in scanned:
+        pieces, last_end = [], 0
+        for (start, end), value in zip(scanned['spans'], scanned['values']):
+            if value in translated_texts:
+                pieces.append(description[last_end:start])
+                pieces.append(html.escape(translated_texts[value], quote=True))
+                last_end = end
+        pieces.append(description[last_end:])
+        return "".join(pieces)
 
-def translate_text(text, target_language, rate_limiter):
-    if not text or not text.strip():
-        return text, None
+    modified = False
+    for (tag, name), value in zip(scanned['attributes'], scanned['values']):
+        if value in translated_texts:
+            tag[name] = translated_texts[value]
+            modified = True
+    return str(scanned['soup']) if modified else description
 
+def _translate_batch(batch, backend_name, backend_options, target_language, limiter):
+    """
+    Tłumaczy jedną paczkę z ponawianiem (wykładniczy backoff). Wywoływana w wątkach puli.
+    Zwraca (lista tłumaczeń albo None po wyczerpaniu prób, lista komunikatów).
+    """
+    translator = create_backend(backend_name, 'pl', target_language, **(backend_options or {}))
+    messages = []
     for attempt in range(MAX_RETRIES):
         try:
-            rate_limiter.wait()
-            translated_text = GoogleTranslator(source='pl', target=target_language).translate(text)
-            return translated_text, None
+            limiter.wait()
+            translated_batch = translator.translate_batch(batch)
+            limiter.on_success()
+            return translated_batch, messages
         except Exception as e:
-            logging.warning(f"Błąd tłumaczenia (próba {attempt + 1}/{MAX_RETRIES}): {e}. Ponawiam za {RETRY_DELAY}s.")
+            if isinstance(e, RateLimitError) or "too many requests" in str(e).lower():
+                new_rate = limiter.on_rate_limited()
+                messages.append(f"⚠️ Limit zapytań przekroczony - zwalniam do {new_rate:.2f} zapytań/s.")
+            logging.warning(f"Błąd tłumaczenia paczki (próba {attempt + 1}/{MAX_RETRIES}): {e}")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-    return text, "Nie udało się przetłumaczyć tekstu po wielu próbach."
+                time.sleep(min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)) + random.uniform(0, 1))
+            else:
+                messages.append(f"Nie udało się przetłumaczyć paczki po {MAX_RETRIES} próbach. Błąd: {e}")
+    return None, messages
 
-def process_row(row, id_column, description_column, target_language, rate_limiter):
-    product_id = row[id_column]
-    description = row[description_column]
-    errors = []
-
-    if not isinstance(description, str) or not description.strip():
-        return description, []
+def translate_in_batches(texts_by_language, backend_name, backend_options, limiter, batch_size, num_workers, translated_texts, errors, progress_callback, translation_memory=None):
+    """
+    Tłumaczy teksty ({język: lista tekstów}) paczkami wysyłanymi równolegle przez `num_workers` wątków ze wspólnym,
+    adaptacyjnym limiterem. Paczki różnych języków trafiają do puli na przemian, więc wszystkie języki postępują jednocześnie.
+    Wyniki (lub oryginały przy błędzie) trafiają do `translated_texts[język]`, a udane tłumaczenia - do pamięci tłumaczeń.
+    """
+    language_batches = [
+        [(language, texts[i:i+batch_size]) for i in range(0, len(texts), batch_size)]
+        for language, texts in texts_by_language.items()
+    ]
+    batches = [item for round_batches in zip_longest(*language_batches) for item in round_batches if item]
+    total_texts = sum(len(texts) for texts in texts_by_language.values())
+    workers = max(1, min(num_workers, len(batches)))
+    progress_callback(f"Wysyłam {len(batches)} paczek do tłumaczenia ({workers} wątków)...")
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_translate_batch, batch, backend_name, backend_options, language, limiter): (language, batch)
+            for language, batch in batches
+        }
+        for future in as_completed(futures):
+            language, batch = futures[future]
+            language_texts = translated_texts[language]
+            translated_batch, messages = future.result()
+            for message in messages:
+                progress_callback(message)
+            if translated_batch is None:
+                errors.append(f"[{language.upper()}] {messages[-1]}")
+                # Zapisz oryginalne teksty z paczki, aby ich nie stracić
+                for text in batch:
+                    language_texts.setdefault(text, text)
+            else:
+                successful = []
+                for original, translated in zip(batch, translated_batch):
+                    if translated:
+                        language_texts[original] = translated
+                        successful.append((original, translated))
+                    else:
+                        language_texts[original] = original # Zostaw oryginał w razie błędu
+                        errors.append(f"[{language.upper()}] Błąd tłumaczenia dla tekstu: '{original}' (otrzymano pustą odpowiedź)")
+                if translation_memory:
+                    translation_memory.put_many('pl', language, successful)
+            done += len(batch)
+            progress_callback(f"Przetłumaczono {done}/{total_texts} tekstów...")
 
-    soup = BeautifulSoup(description, 'html.parser')
-    
-    for tag in soup.find_all(True, alt=True):
-        original_alt = tag['alt']
-        translated_alt, error = translate_text(original_alt, target_language, rate_limiter)
-        if error:
-            errors.append(f"ID: {product_id}, Atrybut: alt, Błąd: {error}, Oryginał: '{original_alt}'")
-        tag['alt'] = translated_alt
-
-    for tag in soup.find_all(True, title=True):
-        original_title = tag['title']
-        translated_title, error = translate_text(original_title, target_language, rate_limiter)
-        if error:
-            errors.append(f"ID: {product_id}, Atrybut: title, Błąd: {error}, Oryginał: '{original_title}'")
-        tag['title'] = translated_title
-
-    return str(soup), errors
-
-def run_attribute_translator(input_path, id_column, description_column, target_language, num_workers, batch_size, progress_callback):
+def run_attribute_translator(input_path, id_column, description_column, target_language, num_workers, batch_size, progress_callback, backend_name='google', backend_options=None, use_translation_memory=True):
+    """
+    Tłumaczy atrybuty alt/title w opisach. `target_language` to kod języka albo lista kodów - opisy są skanowane raz,
+    a każdy język trafia do osobnej kolumny `<opis>_generated_<kod>` (przy jednym języku: `<opis>_generated`).
+    """
+    translation_memory = None
+    target_languages = [target_language] if isinstance(target_language, str) else list(dict.fromkeys(target_language))
     try:
         progress_callback("Etap 1/4: Wczytywanie pliku i zbieranie tekstów...")
-        df = pd.read_csv(input_path, on_bad_lines='skip').fillna('')
-        
-        if id_column not in df.columns or description_column not in df.columns:
+        columns = pd.read_csv(input_path, nrows=0, on_bad_lines='skip').columns
+        if id_column not in columns or description_column not in columns:
             raise ValueError("Wybrane kolumny nie istnieją w pliku.")
 
-        texts_to_translate = set()
-        for desc in df[description_column]:
-            if isinstance(desc, str) and desc.strip():
-                soup = BeautifulSoup(desc, 'html.parser')
-                for tag in soup.find_all(True, alt=True):
-                    if tag['alt'].strip(): texts_to_translate.add(tag['alt'])
-                for tag in soup.find_all(True, title=True):
-                    if tag['title'].strip(): texts_to_translate.add(tag['title'])
+        backend_class = get_backend_class(backend_name)
+        # Wspólny limiter wszystkich wątków pilnuje paczek (nie pojedynczych tekstów) i sam dostraja tempo;
+        # Google tłumaczy paczkę tekst po tekście, więc startuje od sprawdzonej 1 paczki na sekundę
+        if backend_class.supports_packing:
+            limiter = RateLimiter(PER_TEXT_BATCHES_PER_SECOND, cooldown=RATE_LIMIT_COOLDOWN)
+        else:
+            limiter = RateLimiter(backend_class.requests_per_second, cooldown=RATE_LIMIT_COOLDOWN)
+        if backend_class.max_batch_items:
+            batch_size = min(batch_size, backend_class.max_batch_items)
+        progress_callback(f"Silnik tłumaczeń: {backend_class.label}, paczki po {batch_size} tekstów, {num_workers} wątków.")
 
-        if not texts_to_translate:
-            progress_callback("Nie znaleziono żadnych atrybutów 'alt' lub 'title' do tłumaczenia.")
-            return "Zakończono. Nie znaleziono tekstów."
+        # Trwała pamięć tłumaczeń (wspólna z tłumaczem opisów) - powtarzające się podpisy zdjęć nie są tłumaczone ponownie
+        if use_translation_memory and backend_class.cacheable:
+            translation_memory = TranslationMemory(TRANSLATION_MEMORY_FILE, backend_class.memory_engine(**(backend_options or {})))
 
-        progress_callback(f"Etap 2/4: Tłumaczenie {len(texts_to_translate)} unikalnych tekstów...")
-        
-        source_texts = list(texts_to_translate)
-        translated_texts = {}
+        output_path = input_path.replace(".csv", "_generated.csv")
+        errors_path = output_path.replace(".csv", "_errors.txt")
+        if len(target_languages) == 1:
+            output_columns = {target_languages[0]: f"{description_column}_generated"}
+        else:
+            output_columns = {language: f"{description_column}_generated_{language}" for language in target_languages}
+            progress_callback(f"Języki docelowe: {', '.join(language.upper() for language in target_languages)} (osobna kolumna dla każdego).")
+        # Wspólne dla całego pliku, więc powtórzenia w kolejnych paczkach wierszy nie są tłumaczone ponownie
+        translated_texts = {language: {} for language in target_languages}
         errors = []
-        rate_limiter = RateLimiter(RATE_LIMIT)
-        translator = GoogleTranslator(source='pl', target=target_language)
-
-        # Dzielenie na paczki (batch)
-        for i in range(0, len(source_texts), batch_size):
-            batch = source_texts[i:i+batch_size]
-            progress_callback(f"Przygotowuję paczkę {i//batch_size + 1}/{(len(source_texts) + batch_size - 1)//batch_size}...")
-            for attempt in range(MAX_RETRIES):
-                try:
-                    rate_limiter.wait()
-                    progress_callback(f"Wysyłam paczkę do tłumaczenia...")
-                    translated_batch = translator.translate_batch(batch)
-                    progress_callback(f"Otrzymano odpowiedź dla paczki.")
-                    for original, translated in zip(batch, translated_batch):
-                        if translated:
-                            translated_texts[original] = translated
-                        else:
-                            translated_texts[original] = original # Zostaw oryginał w razie błędu
-                            errors.append(f"Błąd tłumaczenia dla tekstu: '{original}' (otrzymano pustą odpowiedź)")
-                    progress_callback(f"Przetłumaczono {min(i + len(batch), len(source_texts))}/{len(source_texts)} tekstów...")
-                    break # Sukces, wyjdź z pętli ponowień
-                except Exception as e:
-                    logging.warning(f"Błąd tłumaczenia paczki (próba {attempt + 1}/{MAX_RETRIES}): {e}")
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY)
-                    else:
-                        errors.append(f"Nie udało się przetłumaczyć paczki po {MAX_RETRIES} próbach. Błąd: {e}")
-                        # Zapisz oryginalne teksty z paczki, aby ich nie stracić
-                        for text in batch:
-                            if text not in translated_texts:
-                                translated_texts[text] = text
-                        break # Idź do następnej paczki
-
-        progress_callback("Etap 3/4: Aktualizowanie opisów w pliku...")
-        
-        output_column_name = f"{description_column}_generated"
-        df[output_column_name] = df[description_column]
-
-        def update_description(desc):
-            if not isinstance(desc, str) or not desc.strip():
-                return desc
-            soup = BeautifulSoup(desc, 'html.parser')
-            modified = False
-            for tag in soup.find_all(True, alt=True):
-                if tag['alt'] in translated_texts:
-                    tag['alt'] = translated_texts[tag['alt']]
-                    modified = True
-            for tag in soup.find_all(True, title=True):
-                if tag['title'] in translated_texts:
-                    tag['title'] = translated_texts[tag['title']]
-                    modified = True
-            return str(soup) if modified else desc
-
-        # Użycie apply jest szybsze dla operacji na kolumnach
-        df[output_column_name] = df[output_column_name].apply(update_description)
+        found_texts = False
 
-        if errors:
-            error_column_name = "błędy"
-            df[error_column_name] = pd.Series(dtype='object')
-            df.at[0, error_column_name] = "\n".join(errors)
+        # Plik jest czytany, tłumaczony i zapisywany paczkami wierszy; każdy opis jest skanowany dokładnie raz
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as output_file:
+            reader = pd.read_csv(input_path, on_bad_lines='skip', chunksize=ROWS_PER_CHUNK)
+            for chunk_number, chunk in enumerate(reader):
+                chunk = chunk.fillna('')
+                rows_label = f"wiersze {chunk.index[0] + 1}-{chunk.index[-1] + 1}"
+                descriptions = chunk[description_column].tolist()
+                scanned_rows = [scan_attributes(description) for description in descriptions]
+
+                chunk_texts = list(dict.fromkeys(
+                    value for scanned in scanned_rows if scanned for value in scanned['values'] if value.strip()
+                ))
+                found_texts = found_texts or any(scanned_rows)
+                texts_by_language = {}
+                for language in target_languages:
+                    new_texts = [text for text in chunk_texts if text not in translated_texts[language]]
+                    if new_texts and translation_memory:
+                        known_translations = translation_memory.get_many('pl', language, new_texts)
+                        translated_texts[language].update(known_translations)
+                        new_texts = [text for text in new_texts if text not in known_translations]
+                        if known_translations:
+                            progress_callback(f"Pamięć tłumaczeń ({language.upper()}): {len(known_translations)} tekstów przetłumaczono wcześniej ({rows_label}).")
+                    if new_texts:
+                        texts_by_language[language] = new_texts
+                if texts_by_language:
+                    pending = sum(len(texts) for texts in texts_by_language.values())
+                    progress_callback(f"Etap 2/4: Tłumaczenie {pending} unikalnych tekstów ({rows_label})...")
+                    translate_in_batches(
+                        texts_by_language, backend_name, backend_options, limiter, batch_size, num_workers,
+                        translated_texts, errors, progress_callback, translation_memory
+                    )
+
+                progress_callback(f"Etap 3/4: Aktualizowanie opisów ({rows_label})...")
+                for language, output_column_name in output_columns.items():
+                    chunk[output_column_name] = [
+                        rebuild_description(description, scanned, translated_texts[language])
+                        for description, scanned in zip(descriptions, scanned_rows)
+                    ]
+                chunk.to_csv(output_file, header=(chunk_number == 0), index=False)
 
         progress_callback("Etap 4/4: Zapisywanie wyników...")
-        output_path = input_path.replace(".csv", "_generated.csv")
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        
+        if not found_texts:
+            os.remove(output_path)
+            progress_callback("Nie znaleziono żadnych atrybutów 'alt' lub 'title' do tłumaczenia.")
+            return "Zakończono. Nie znaleziono tekstów."
+
         progress_callback(f"Zakończono! Plik zapisano w: {output_path}")
         if errors:
-            progress_callback(f"Wystąpiły błędy podczas tłumaczenia. Sprawdź kolumnę 'błędy'.")
-            
+            with open(errors_path, 'w', encoding='utf-8') as errors_file:
+                errors_file.write("\n".join(errors))
+            progress_callback(f"Wystąpiły błędy podczas tłumaczenia. Sprawdź plik: {errors_path}")
+        elif os.path.exists(errors_path):
+            os.remove(errors_path)  # błędy z poprzedniego przebiegu nie dotyczą już nowego pliku wynikowego
+
         return f"Proces zakończony. Wyniki w {output_path}"
 
     except Exception as e:
         logging.error(f"Krytyczny błąd w `run_attribute_translator`: {e}")
         progress_callback(f"Błąd krytyczny: {e}")
         return f"Błąd: {e}"
+    finally:
+        if translation_memory:
+            translation_memory.close()
@@ -1,12 +1,43 @@
 
 import requests
 import time
+import threading
 from typing import Generator, Any
 
 API_ENDPOINT_PATH = "/api/admin/v7/menu/filter"
+# Ustawienia filtra kopiowane ze źródła wraz z wartościami domyślnymi
+FILTER_SETTINGS_DEFAULTS = {
+    "menuFilterDisplay": "name",
+    "menuFilterValueSort": "y",
+    "menuFilterDefaultEnabled": "n"
+}
+FILTERS_CACHE_TTL = 30 * 60  # sekundy; po tym czasie filtry są pobierane ponownie
+
+# Cache filtrów: (base_url, shop_id, menu_id, node_id, lang_id) -> (czas pobrania, filtry); zapis filtrów węzła usuwa jego wpis
+_filters_cache: dict[tuple, tuple[float, dict[str, Any]]] = {}
+_filters_cache_lock = threading.Lock()
+
+def _filters_cache_key(base_url: str, shop_id: int, menu_id: int, menu_node_id: int, lang_id: str) -> tuple:
+    return (base_url, str(shop_id), str(menu_id), str(menu_node_id), lang_id)
+
+def invalidate_menu_filters_cache(base_url: str, shop_id: int, menu_id: int, menu_node_id: int, lang_id: str) -> None:
+    """Usuwa z cache filtry danego węzła menu (np. po ich zmianie)."""
+    with _filters_cache_lock:
+        _filters_cache.pop(_filters_cache_key(base_url, shop_id, menu_id, menu_node_id, lang_id), None)
+
+def get_menu_filters(base_url: str, api_key: str, shop_id: int, menu_id: int, menu_node_id: int, lang_id: str, use_cache: bool = False) -> dict[str, Any]:
+    """
+    Pobiera filtry dla danego węzła menu.
+    Przy use_cache=True zwraca filtry pobrane wcześniej (nie starsze niż FILTERS_CACHE_TTL) bez zapytania do API.
+    Każde pobranie z API odświeża cache.
+    """
+    cache_key = _filters_cache_key(base_url, shop_id, menu_id, menu_node_id, lang_id)
+    if use_cache:
+        with _filters_cache_lock:
+            cached = _filters_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < FILTERS_CACHE_TTL:
+            return cached[1]
 
-def get_menu_filters(base_url: str, api_key: str, shop_id: int, menu_id: int, menu_node_id: int, lang_id: str) -> dict[str, Any]:
-    """Pobiera filtry dla danego węzła menu."""
     api_url = f"{base_url}{API_ENDPOINT_PATH}"
     params = {
         'shopId': shop_id,
@@ -26,7 +57,10 @@ def get_menu_filters(base_url: str, api_key: str, shop_id: int, menu_id: int, me
         data = response.json()
         if not data.get("result"):
             raise RuntimeError("Odpowiedź API nie zawiera danych filtrów ('result' jest pusty).")
-        return data['result']['menuFilters']
+        menu_filters = data['result']['menuFilters']
+        with _filters_cache_lock:
+            _filters_cache[cache_key] = (time.monotonic(), menu_filters)
+        return menu_filters
     except requests.exceptions.HTTPError as errh:
         raise RuntimeError(f"BŁĄD HTTP podczas pobierania filtrów: {errh}\nURL: {response.request.url}\nTreść: {response.text}") from errh
     except requests.exceptions.RequestException as err:
@@ -66,6 +100,21 @@ def set_menu_filters(base_url: str, api_key: str, shop_id: int, menu_id: int, me
         raise RuntimeError(error_details) from errh
     except requests.exceptions.RequestException as err:
         raise RuntimeError(f"BŁĄD krytyczny podczas ustawiania filtrów: {err}") from err
+    finally:
+        # Filtry w węźle mogły się zmienić (także przy częściowo nieudanym zapisie) - kolejny odczyt musi trafić do API
+        invalidate_menu_filters_cache(base_url, shop_id, menu_id, menu_node_id, lang_id)
+
+def _active_filters_match(dest_active_filters: dict[str, Any], filters_to_set: list[dict[str, Any]]) -> bool:
+    """Sprawdza, czy w węźle docelowym aktywne są już dokładnie te filtry (te same ustawienia i kolejność)."""
+    if len(dest_active_filters) != len(filters_to_set):
+        return False
+    for active_data, wanted in zip(dest_active_filters.values(), filters_to_set):
+        if str(active_data.get("menuFilterId")) != str(wanted["menuFilterId"]):
+            return False
+        for key, default in FILTER_SETTINGS_DEFAULTS.items():
+            if active_data.get(key, default) != wanted[key]:
+                return False
+    return True
 
 def run_copy_filters_for_node(
     base_url: str, 
@@ -77,14 +126,18 @@ def run_copy_filters_for_node(
     dest_menu_id: int, 
     dest_node_id: int, 
     source_lang_id: str,
-    dest_lang_id: str
+    dest_lang_id: str,
+    stats: dict[str, int] | None = None
 ) -> Generator[str, None, None]:
-    """Kopiuje ustawienia filtrów z jednego węzła do drugiego."""
+    """
+    Kopiuje ustawienia filtrów z jednego węzła do drugiego.
+    Opcjonalny słownik `stats` jest uzupełniany licznikami 'written' i 'skipped_unchanged'.
+    """
     yield f"    -> Rozpoczynanie kopiowania filtrów dla węzła {source_node_id} -> {dest_node_id}..."
     
     try:
-        # 1. Pobierz filtry ze źródła
-        source_filters = get_menu_filters(base_url, api_key, source_shop_id, source_menu_id, source_node_id, source_lang_id)
+        # 1. Pobierz filtry ze źródła (z cache, jeśli były już pobrane, np. przy synchronizacji do kilku języków)
+        source_filters = get_menu_filters(base_url, api_key, source_shop_id, source_menu_id, source_node_id, source_lang_id, use_cache=True)
         source_active_filters = source_filters.get('menuFiltersActive', {})
         
         if not source_active_filters:
@@ -93,9 +146,10 @@ def run_copy_filters_for_node(
             
         yield f"    -> Znaleziono {len(source_active_filters)} aktywnych filtrów w źródle (język: {source_lang_id}). Dopasowywanie po ID z zachowaniem kolejności."
 
-        # 2. Pobierz wszystkie filtry z celu
+        # 2. Pobierz wszystkie filtry z celu (zawsze świeże, bo porównujemy je z aktualnym stanem)
         dest_filters = get_menu_filters(base_url, api_key, dest_shop_id, dest_menu_id, dest_node_id, dest_lang_id)
-        all_dest_filters = {**dest_filters.get('menuFiltersActive', {}), **dest_filters.get('menuFiltersNonActive', {})}
+        dest_active_filters = dest_filters.get('menuFiltersActive', {})
+        all_dest_filters = {**dest_active_filters, **dest_filters.get('menuFiltersNonActive', {})}
         
         if not all_dest_filters:
             yield f"    -> OSTRZEŻENIE: Nie znaleziono żadnych dostępnych filtrów w węźle docelowym {dest_node_id} (język: {dest_lang_id})."
@@ -110,16 +164,20 @@ def run_copy_filters_for_node(
                     "menuFilterId": dest_data['menuFilterId'],
                     "menuFilterName": dest_data['menuFilterName'],
                     # Przenosimy ustawienia ze źródła, jeśli istnieją, z domyślnymi wartościami
-                    "menuFilterDisplay": source_data.get("menuFilterDisplay", "name"),
-                    "menuFilterValueSort": source_data.get("menuFilterValueSort", "y"),
-                    "menuFilterDefaultEnabled": source_data.get("menuFilterDefaultEnabled", "n")
+                    **{key: source_data.get(key, default) for key, default in FILTER_SETTINGS_DEFAULTS.items()}
                 })
         
         yield f"    -> Znaleziono {len(dest_filters_to_set)} pasujących filtrów w celu."
 
-        # 4. Ustaw filtry w celu
-        if dest_filters_to_set:
+        # 4. Ustaw filtry w celu (pomijamy zapis, jeśli cel ma już identyczną konfigurację)
+        if dest_filters_to_set and _active_filters_match(dest_active_filters, dest_filters_to_set):
+            if stats is not None:
+                stats['skipped_unchanged'] = stats.get('skipped_unchanged', 0) + 1
+            yield f"    -> Bez zmian: Węzeł docelowy {dest_node_id} (język: {dest_lang_id}) ma już te same aktywne filtry. Pomijanie zapisu."
+        elif dest_filters_to_set:
             set_menu_filters(base_url, api_key, dest_shop_id, dest_menu_id, dest_node_id, dest_lang_id, dest_filters_to_set)
+            if stats is not None:
+                stats['written'] = stats.get('written', 0) + 1
             yield f"    -> Sukces: Ustawiono {len(dest_filters_to_set)} filtrów w węźle docelowym {dest_node_id} (język: {dest_lang_id})."
         else:
             yield f"    -> Informacja: Nie znaleziono pasujących filtrów do ustawienia w węźle docelowym."
@@ -1,71 +1,313 @@
 
 import pandas as pd
-from bs4 import BeautifulSoup
 import openai
 import json
 import time
 import os
+import re
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 
-def clean_html(html_text):
-    if not isinstance(html_text, str): return ""
-    soup = BeautifulSoup(html_text, 'html.parser')
-    return soup.get_text(separator=' ', strip=True)
+from .feature_cache import FeatureCache, FEATURE_CACHE_FILE
+from .result_writer import BufferedResultWriter, load_processed_ids, remove_output
+from .html_fragments import html_to_text, html_to_texts, create_process_pool, process_in_chunks
 
-def extract_features_with_ai(client, text_description, progress_callback, should_stop_callback):
-    while True:
+# Konfiguracja
+FEATURES_MODEL = "gpt-3.5-turbo"
+CREATIVE_MODEL = "gpt-4o"
+MAX_CONCURRENT_PRODUCTS = 8  # tyle produktów jest przetwarzanych jednocześnie
+REQUESTS_PER_MINUTE = 500  # limit zapytań na minutę (osobno dla każdego modelu)
+TOKENS_PER_MINUTE = 30000  # limit tokenów na minutę (osobno dla każdego modelu)
+CHARS_PER_TOKEN = 4  # przybliżenie do szacowania tokenów przed wysłaniem zapytania
+FEATURES_OUTPUT_TOKENS = 200  # szacowana długość odpowiedzi z cechami
+CREATIVE_OUTPUT_TOKENS = 800  # szacowana długość odpowiedzi z treścią kreatywną
+PRODUCTS_PER_FEATURES_REQUEST = 1  # domyślnie każdy produkt to osobne zapytanie o cechy
+MAX_PRODUCTS_PER_FEATURES_REQUEST = 20
+MAX_RETRIES = 5  # liczba prób jednego zapytania przy błędach przejściowych
+RETRY_BASE_DELAY = 2  # sekundy, podwajane przy każdej kolejnej próbie
+RETRY_MAX_DELAY = 120  # górny limit oczekiwania przed ponowieniem
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+FATAL_ERRORS = (openai.AuthenticationError, openai.PermissionDeniedError)  # dotyczą całego przebiegu, nie produktu
+FAILED_OUTPUT_SUFFIX = "_nieudane"  # plik z produktami, których nie udało się przetworzyć
+FAILED_PRODUCT_COLUMNS = ('przebieg', 'etap', 'typ_bledu', 'blad', 'proby', 'czas')  # kolumny pliku nieudanych (po kolumnie ID)
+CLEAN_TEXT_COLUMN = "_oczyszczony_opis"  # kolumna pomocnicza z opisem bez HTML (tylko w pamięci)
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_MAX_REQUESTS = 50000  # limit zapytań w jednym zadaniu wsadowym
+BATCH_POLL_INTERVAL = 30  # sekundy między sprawdzeniami stanu zadań wsadowych
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+BATCH_STATE_SUFFIX = ".batch.json"  # stan wysłanych zadań wsadowych, obok pliku wynikowego
+
+class RequestBudget:
+    """
+    Limit zapytań i tokenów na minutę w oknie przesuwnym, wspólny dla wszystkich wątków.
+    Przed zapytaniem rezerwowana jest szacowana liczba tokenów, a po odpowiedzi - korygowana o faktyczne zużycie.
+    """
+    WINDOW = 60.0  # sekundy
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.lock = threading.Lock()
+        self.requests = deque()  # czasy wysłania zapytań
+        self.tokens = deque()  # rezerwacje [czas, liczba tokenów]
+        self.tokens_used = 0
+
+    def _trim(self, now):
+        while self.requests and now - self.requests[0] >= self.WINDOW:
+            self.requests.popleft()
+        while self.tokens and now - self.tokens[0][0] >= self.WINDOW:
+            self.tokens_used -= self.tokens.popleft()[1]
+
+    def acquire(self, estimated_tokens, should_stop_callback=lambda: False):
+        """
+        Czeka, aż w oknie zmieści się kolejne zapytanie z `estimated_tokens` tokenami.
+        Zwraca rezerwację (do przekazania do `record_usage`) albo None po przerwaniu.
+        """
+        while not should_stop_callback():
+            with self.lock:
+                now = time.monotonic()
+                self._trim(now)
+                requests_ok = len(self.requests) < self.requests_per_minute
+                # Pojedyncze zapytanie większe niż cały limit przechodzi, gdy okno jest puste
+                tokens_ok = self.tokens_used + estimated_tokens <= self.tokens_per_minute or not self.tokens
+                if requests_ok and tokens_ok:
+                    reservation = [now, estimated_tokens]
+                    self.requests.append(now)
+                    self.tokens.append(reservation)
+                    self.tokens_used += estimated_tokens
+                    return reservation
+                oldest = min(self.requests[0] if not requests_ok else now, self.tokens[0][0] if not tokens_ok else now)
+                delay = max(0.05, self.WINDOW - (now - oldest))
+            time.sleep(min(delay, 1.0))
+        return None
+
+    def record_usage(self, reservation, actual_tokens):
+        """Zastępuje szacunek w rezerwacji faktycznym zużyciem z odpowiedzi API."""
+        if actual_tokens is None:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self._trim(now)
+            if now - reservation[0] < self.WINDOW:  # rezerwacja jest jeszcze w oknie
+                self.tokens_used += actual_tokens - reservation[1]
+            reservation[1] = actual_tokens
+
+def estimate_tokens(messages, output_tokens):
+    return sum(len(message["content"]) for message in messages) // CHARS_PER_TOKEN + output_tokens
+
+def create_chat_completion(client, budget, output_tokens, should_stop_callback, **request):
+    """Wysyła zapytanie do API po zarezerwowaniu miejsca w limicie (jeśli podano `budget`). Zwraca None po przerwaniu."""
+    reservation = None
+    if budget:
+        reservation = budget.acquire(estimate_tokens(request["messages"], output_tokens), should_stop_callback)
+        if reservation is None:
+            return None
+    response = client.chat.completions.create(**request)
+    if budget:
+        usage = getattr(response, "usage", None)
+        budget.record_usage(reservation, getattr(usage, "total_tokens", None))
+    return response
+
+class RequestFailedError(Exception):
+    """Zapytanie do API nie powiodło się trwale: błąd nieprzejściowy albo wyczerpane próby."""
+    def __init__(self, stage, error, attempts):
+        super().__init__(f"{type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def fatal(self):
+        return isinstance(self.error, FATAL_ERRORS)
+
+def is_transient_error(error):
+    """Błędy, które mogą ustąpić po ponowieniu: limity, połączenie, błędy serwera i niepoprawny JSON od modelu."""
+    if isinstance(error, (openai.APIConnectionError, json.JSONDecodeError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in TRANSIENT_STATUS_CODES
+
+def parse_reset_duration(value):
+    """Czas z nagłówków x-ratelimit-reset-* (np. "6m0s", "1.5s", "250ms") w sekundach albo None."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value or "")
+    if not parts:
+        return None
+    return sum(float(number) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit] for number, unit in parts)
+
+def retry_delay(attempt, error):
+    """
+    Czas oczekiwania przed kolejną próbą: nagłówki retry-after(-ms), a przy przekroczeniu limitu x-ratelimit-reset-*;
+    jeśli ich brak - wykładniczy backoff z losowym rozrzutem.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
         try:
-            if not text_description or len(text_description) < 20:
-                progress_callback("Pomijam: Opis jest zbyt krótki lub pusty.")
-                return []
-            
-            prompt = f"Przeanalizuj poniższy opis produktu. Wyodrębnij od 3 do 5 jego najważniejszych, konkretnych cech (materiał, funkcje, wymiary itp.). Zwróć je jako zwięzłą listę. Opis: --- {text_description} ---"
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Jesteś precyzyjnym analitykiem danych produktowych."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0
-            )
-            content = response.choices[0].message.content
-            features = [line.strip().lstrip('0123456789. -*') for line in content.split('\n') if line.strip()]
-            progress_callback(f"Wyodrębniono cechy: {features}")
-            return features
-        except Exception as e:
-            progress_callback(f"Błąd podczas ekstrakcji cech: {e}. Próbuję ponownie za 15 sekund...")
-            time.sleep(15)
-            if should_stop_callback():
-                return []
+            return min(RETRY_MAX_DELAY, float(headers.get(header)) * scale)
+        except (TypeError, ValueError):
+            pass
+    if isinstance(error, openai.RateLimitError):
+        resets = [parse_reset_duration(headers.get(header)) for header in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+        resets = [reset for reset in resets if reset is not None]
+        if resets:
+            return min(RETRY_MAX_DELAY, max(resets))
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)) + random.uniform(0, 1)
 
-def generate_creative_content_with_ai(client, feature_list, user_prompt, progress_callback, should_stop_callback):
-    while True:
+def sleep_unless_stopped(seconds, should_stop_callback):
+    """Czeka `seconds` sekund, sprawdzając prośbę o zatrzymanie. Zwraca True, jeśli przerwano."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if should_stop_callback():
+            return True
+        time.sleep(min(0.5, deadline - time.monotonic()))
+    return should_stop_callback()
+
+def call_with_retries(call, stage, progress_callback, should_stop_callback):
+    """
+    Wywołuje `call` i ponawia je (najwyżej MAX_RETRIES prób) tylko przy błędach przejściowych.
+    Zwraca wynik albo None po przerwaniu; błąd trwały lub wyczerpanie prób kończy się RequestFailedError.
+    """
+    for attempt in range(MAX_RETRIES):
         try:
-            if not feature_list:
-                progress_callback("Pomijam: Brak cech do wygenerowania treści.")
-                return None
-            
-            features_str = ", ".join(feature_list)
-            prompt = user_prompt.replace('{features_str}', features_str)
-            
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": "Jesteś kreatywnym copywriterem i zwracasz odpowiedzi w formacie JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            content = response.choices[0].message.content
-            progress_callback("Treść kreatywna została wygenerowana.")
-            return json.loads(content)
+            return call()
         except Exception as e:
-            progress_callback(f"Błąd podczas generowania treści kreatywnej: {e}. Próbuję ponownie za 15 sekund...")
-            time.sleep(15)
-            if should_stop_callback():
+            if not is_transient_error(e) or attempt == MAX_RETRIES - 1:
+                raise RequestFailedError(stage, e, attempt + 1) from e
+            delay = retry_delay(attempt, e)
+            progress_callback(f"Błąd przejściowy ({stage}, próba {attempt + 1}/{MAX_RETRIES}): {e}. Ponawiam za {delay:.1f}s...")
+            if sleep_unless_stopped(delay, should_stop_callback):
                 return None
 
+def clean_html(html_text):
+    return html_to_text(html_text)
+
+def add_clean_texts(df, description_column, progress_callback):
+    """
+    Oczyszcza całą kolumnę opisów jeszcze przed wysyłaniem zapytań (duże pliki - w puli procesów),
+    więc wątki sieciowe nie czekają na parsowanie HTML. Wynik trafia do kolumny CLEAN_TEXT_COLUMN.
+    """
+    start_time = time.monotonic()
+    descriptions = df[description_column].tolist() if description_column in df.columns else [""] * len(df)
+    with create_process_pool() as pool:
+        clean_texts = [text for chunk in process_in_chunks(html_to_texts, descriptions, executor=pool) for text in chunk]
+    df[CLEAN_TEXT_COLUMN] = clean_texts
+    progress_callback(f"Oczyszczono {len(clean_texts)} opisów HTML w {time.monotonic() - start_time:.1f}s.")
+
+def row_clean_text(row, description_column):
+    """Oczyszczony opis produktu: przygotowany wcześniej przez add_clean_texts albo obliczony na miejscu."""
+    clean_text = row.get(CLEAN_TEXT_COLUMN)
+    return clean_text if isinstance(clean_text, str) else clean_html(row.get(description_column, ''))
+
+def build_features_request(text_description):
+    """Parametry zapytania o cechy produktu (wspólne dla trybu zwykłego i wsadowego)."""
+    prompt = f"Przeanalizuj poniższy opis produktu. Wyodrębnij od 3 do 5 jego najważniejszych, konkretnych cech (materiał, funkcje, wymiary itp.). Zwróć je jako zwięzłą listę. Opis: --- {text_description} ---"
+    return {
+        "model": FEATURES_MODEL,
+        "messages": [
+            {"role": "system", "content": "Jesteś precyzyjnym analitykiem danych produktowych."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.0
+    }
+
+def parse_features(content):
+    return [line.strip().lstrip('0123456789. -*') for line in content.split('\n') if line.strip()]
+
+def build_multi_features_request(texts_by_id):
+    """Jedno zapytanie o cechy kilku produktów ({ID: oczyszczony opis}); odpowiedź to JSON z cechami według ID."""
+    prompt = (
+        "Poniżej znajdują się opisy kilku produktów jako obiekt JSON {ID produktu: opis}. Dla każdego produktu wyodrębnij "
+        "od 3 do 5 jego najważniejszych, konkretnych cech (materiał, funkcje, wymiary itp.). "
+        'Zwróć obiekt JSON {"produkty": {ID produktu: [lista cech]}} z dokładnie tymi samymi ID. '
+        f"Opisy: {json.dumps(texts_by_id, ensure_ascii=False)}"
+    )
+    return {
+        "model": FEATURES_MODEL,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": "Jesteś precyzyjnym analitykiem danych produktowych i zwracasz odpowiedzi w formacie JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.0
+    }
+
+def parse_multi_features(content, expected_ids):
+    """
+    Zwraca {ID: lista cech} dla produktów z poprawną listą cech w odpowiedzi zbiorczej.
+    Rzuca ValueError, gdy odpowiedź nie ma oczekiwanej struktury.
+    """
+    products = json.loads(content).get("produkty") if content else None
+    if not isinstance(products, dict):
+        raise ValueError("brak obiektu 'produkty' w odpowiedzi")
+    features_by_id = {}
+    for product_id in expected_ids:
+        features = products.get(product_id)
+        if isinstance(features, list):
+            features = [str(feature).strip() for feature in features if str(feature).strip()]
+            if features:
+                features_by_id[product_id] = features
+    return features_by_id
+
+def build_creative_request(feature_list, user_prompt):
+    """Parametry zapytania o treść kreatywną (wspólne dla trybu zwykłego i wsadowego)."""
+    features_str = ", ".join(feature_list)
+    prompt = user_prompt.replace('{features_str}', features_str)
+    return {
+        "model": CREATIVE_MODEL,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": "Jesteś kreatywnym copywriterem i zwracasz odpowiedzi w formacie JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7
+    }
+
+def extract_features_with_ai(client, text_description, progress_callback, should_stop_callback, budget=None, feature_cache=None):
+    """Zwraca listę cech (pustą przy zbyt krótkim opisie lub przerwaniu). Trwałe niepowodzenie zapytania: RequestFailedError."""
+    if not text_description or len(text_description) < 20:
+        progress_callback("Pomijam: Opis jest zbyt krótki lub pusty.")
+        return []
+
+    request = build_features_request(text_description)
+    if feature_cache:
+        cached_features = feature_cache.get(request)
+        if cached_features:
+            progress_callback(f"Cechy z pamięci podręcznej: {cached_features}")
+            return cached_features
+
+    response = call_with_retries(
+        lambda: create_chat_completion(client, budget, FEATURES_OUTPUT_TOKENS, should_stop_callback, **request),
+        "ekstrakcja cech", progress_callback, should_stop_callback
+    )
+    if response is None:
+        return []
+    features = parse_features(response.choices[0].message.content)
+    progress_callback(f"Wyodrębniono cechy: {features}")
+    if feature_cache:
+        feature_cache.put(request, features)
+    return features
+
+def generate_creative_content_with_ai(client, feature_list, user_prompt, progress_callback, should_stop_callback, budget=None):
+    """Zwraca treść kreatywną (słownik) albo None po przerwaniu. Trwałe niepowodzenie zapytania: RequestFailedError."""
+    if not feature_list:
+        progress_callback("Pomijam: Brak cech do wygenerowania treści.")
+        return None
+
+    def request_content():
+        response = create_chat_completion(
+            client, budget, CREATIVE_OUTPUT_TOKENS, should_stop_callback,
+            **build_creative_request(feature_list, user_prompt)
+        )
+        # Niepoprawny JSON od modelu jest błędem przejściowym - kolejna próba zwykle się udaje
+        return None if response is None else json.loads(response.choices[0].message.content)
+
+    content = call_with_retries(request_content, "treść kreatywna", progress_callback, should_stop_callback)
+    if content is not None:
+        progress_callback("Treść kreatywna została wygenerowana.")
+    return content
+
 def create_product_html(product_name, teaser, main_description, feature_list, color):
     # More robust CSS with the selected color
     style = f"""
@@ -126,11 +368,419 @@ def create_product_html(product_name, teaser, main_description, feature_list, co
                  f'</div>'
     return final_html
 
-def run_description_generator(api_key, input_path, user_prompt, use_html_frame, frame_color, id_column, description_column, progress_callback, should_stop_callback):
+def extract_features_multi(client, texts_by_id, progress_callback, should_stop_callback, budget=None, feature_cache=None):
+    """
+    Wyodrębnia cechy kilku produktów ({ID: oczyszczony opis}) jednym zapytaniem. Zwraca {ID: cechy} tylko dla produktów
+    z poprawną odpowiedzią - pozostałe (również po niepoprawnej odpowiedzi) wywołujący przetwarza pojedynczymi zapytaniami.
+    Pamięć podręczna używa tych samych kluczy co zapytania pojedyncze, więc oba tryby korzystają ze wspólnych wyników.
+    """
+    requests_by_id = {
+        product_id: build_features_request(text) for product_id, text in texts_by_id.items()
+        if text and len(text) >= 20
+    }
+    found = feature_cache.get_many(requests_by_id) if feature_cache else {}
+    pending = {product_id: texts_by_id[product_id] for product_id in requests_by_id if product_id not in found}
+    if len(pending) < 2:
+        return found
+
+    try:
+        response = call_with_retries(
+            lambda: create_chat_completion(
+                client, budget, FEATURES_OUTPUT_TOKENS * len(pending), should_stop_callback,
+                **build_multi_features_request(pending)
+            ),
+            "zbiorcza ekstrakcja cech", progress_callback, should_stop_callback
+        )
+        if response is None:
+            return found
+        parsed = parse_multi_features(response.choices[0].message.content, pending)
+    except Exception as e:
+        progress_callback(f"Ostrzeżenie: Niepoprawna odpowiedź zbiorcza dla {len(pending)} produktów ({e}). Wysyłam je pojedynczo.")
+        return found
+
+    if len(parsed) < len(pending):
+        progress_callback(f"Ostrzeżenie: Odpowiedź zbiorcza nie zawiera cech dla {len(pending) - len(parsed)} z {len(pending)} produktów. Wysyłam je pojedynczo.")
+    progress_callback(f"Wyodrębniono cechy {len(parsed)} produktów jednym zapytaniem.")
+    if feature_cache:
+        feature_cache.put_many((requests_by_id[product_id], features) for product_id, features in parsed.items())
+    found.update(parsed)
+    return found
+
+def process_product_group(client, budgets, rows, user_prompt, use_html_frame, frame_color, id_column, description_column, progress_callback, should_stop_callback, feature_cache=None):
+    """
+    Przetwarza paczkę produktów: cechy wszystkich produktów jednym zapytaniem (gdy w paczce jest ich kilka),
+    a treść kreatywną - osobno dla każdego. Wywoływana w wątkach puli.
+    Zwraca listę (ID produktu, wiersz wynikowy albo None, RequestFailedError albo None).
+    """
+    features_by_id = {}
+    if len(rows) > 1:
+        texts_by_id = {str(row.get(id_column)): row_clean_text(row, description_column) for row in rows}
+        features_by_id = extract_features_multi(client, texts_by_id, progress_callback, should_stop_callback, budgets[FEATURES_MODEL], feature_cache)
+
+    results = []
+    for row in rows:
+        product_id = row.get(id_column)
+        if should_stop_callback():
+            results.append((product_id, None, None))
+            continue
+        try:
+            results.append((product_id, process_product(
+                client, budgets, row, user_prompt, use_html_frame, frame_color, id_column, description_column,
+                progress_callback, should_stop_callback, feature_cache, features_by_id.get(str(product_id))
+            ), None))
+        except RequestFailedError as e:
+            results.append((product_id, None, e))
+    return results
+
+def process_product(client, budgets, row, user_prompt, use_html_frame, frame_color, id_column, description_column, progress_callback, should_stop_callback, feature_cache=None, features=None):
+    """
+    Przetwarza jeden produkt (ekstrakcja cech, o ile nie podano `features`, i treść kreatywna).
+    Zwraca wiersz wynikowy albo None, gdy produkt pominięto (brak cech lub przerwanie).
+    Trwałe niepowodzenie zapytania kończy się RequestFailedError.
+    """
+    product_id = row.get(id_column)
+
+    def prefixed_callback(msg):
+        progress_callback(f"[ID: {product_id}] {msg}")
+
+    if features is None:
+        clean_text = row_clean_text(row, description_column)
+        features = extract_features_with_ai(client, clean_text, prefixed_callback, should_stop_callback, budgets[FEATURES_MODEL], feature_cache)
+    if not features:
+        return None
+
+    creative_content = generate_creative_content_with_ai(client, features, user_prompt, prefixed_callback, should_stop_callback, budgets[CREATIVE_MODEL])
+    if creative_content is None:
+        return None
+    return build_result_row(product_id, creative_content, use_html_frame, frame_color, id_column)
+
+def build_result_row(product_id, creative_content, use_html_frame, frame_color, id_column):
+    """Wiersz pliku wynikowego z treści kreatywnej (z nazwą i opisem "BŁĄD", gdy treści brak)."""
+    result_row = { id_column: product_id }
+
+    if creative_content and isinstance(creative_content, dict):
+        product_name = creative_content.get('nazwa_produktu', 'Nowy Produkt')
+
+        if use_html_frame:
+            final_description = create_product_html(
+                product_name,
+                creative_content.get('zajawka', ''),
+                creative_content.get('opis_glowny', ''),
+                creative_content.get('cechy_marketingowe', []),
+                frame_color
+            )
+        else:
+            zajawka = creative_content.get('zajawka', '')
+            opis_glowny = creative_content.get('opis_glowny', '')
+            cechy = "\n".join([f"- {feat}" for feat in creative_content.get('cechy_marketingowe', [])])
+            final_description = f"{product_name}\n\n{zajawka}\n\n{opis_glowny}\n\nCechy:\n{cechy}"
+
+        result_row['wygenerowana_nazwa'] = product_name
+        result_row['nowy_opis_html'] = final_description
+    else:
+        result_row['wygenerowana_nazwa'] = "BŁĄD"
+        result_row['nowy_opis_html'] = "BŁĄD"
+    return result_row
+
+def default_failed_path(output_path):
+    return f"{os.path.splitext(output_path)[0]}{FAILED_OUTPUT_SUFFIX}.csv"
+
+def failed_product_row(id_column, product_id, stage, error_type, message, attempts, run_started):
+    """
+    Wiersz pliku z produktami nieudanymi (wspólny dla trybu zwykłego i wsadowego).
+    `run_started` (czas startu przebiegu) pozwala odróżnić błędy z kolejnych uruchomień dopisywane do tego samego pliku.
+    """
+    return {
+        id_column: product_id, 'przebieg': run_started, 'etap': stage, 'typ_bledu': error_type, 'blad': message,
+        'proby': attempts, 'czas': time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def prune_failed_products(failed_path, output_path, id_column):
+    """
+    Usuwa z pliku nieudanych produkty, które są już w pliku wynikowym (udało się je ponowić), a pozostałe
+    wiersze zostawia - błędy poprzednich przebiegów nie giną przed udanym ponowieniem. Pusty plik jest usuwany.
+    Plik jest też przepisywany do aktualnego układu kolumn, aby kolejne wiersze można było do niego dopisywać.
+    """
+    if not os.path.exists(failed_path):
+        return
+    failed = pd.read_csv(failed_path, dtype={id_column: str})
+    processed_ids = load_processed_ids(output_path, id_column)
+    remaining = failed[~failed[id_column].isin(processed_ids)]
+    columns = [id_column, *FAILED_PRODUCT_COLUMNS]
+    if remaining.empty:
+        os.remove(failed_path)
+    elif len(remaining) < len(failed) or list(failed.columns) != columns:
+        remaining.reindex(columns=columns).to_csv(failed_path, index=False, encoding='utf-8')
+
+def batch_state_path(output_path):
+    return output_path + BATCH_STATE_SUFFIX
+
+def save_batch_state(output_path, state):
+    with open(batch_state_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+def submit_batches(client, requests_by_id, stage, progress_callback):
+    """Zapisuje zapytania jako JSONL (po BATCH_MAX_REQUESTS w pliku), wysyła je i zwraca listę ID zadań wsadowych."""
+    items = list(requests_by_id.items())
+    batch_ids = []
+    for start in range(0, len(items), BATCH_MAX_REQUESTS):
+        lines = [
+            json.dumps({"custom_id": f"{stage}-{product_key}", "method": "POST", "url": BATCH_ENDPOINT, "body": body}, ensure_ascii=False)
+            for product_key, body in items[start:start + BATCH_MAX_REQUESTS]
+        ]
+        input_file = client.files.create(file=(f"{stage}.jsonl", "\n".join(lines).encode('utf-8')), purpose="batch")
+        batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+        batch_ids.append(batch.id)
+        progress_callback(f"Wysłano zadanie wsadowe {batch.id} ({len(lines)} zapytań).")
+    return batch_ids
+
+def wait_for_batches(client, batch_ids, progress_callback, should_stop_callback, poll_interval=BATCH_POLL_INTERVAL):
+    """Sprawdza stan zadań co `poll_interval` sekund. Zwraca zakończone zadania albo None po przerwaniu."""
+    while True:
+        batches = [client.batches.retrieve(batch_id) for batch_id in batch_ids]
+        completed = sum(batch.request_counts.completed + batch.request_counts.failed for batch in batches if batch.request_counts)
+        total = sum(batch.request_counts.total for batch in batches if batch.request_counts)
+        statuses = ", ".join(sorted({batch.status for batch in batches}))
+        progress_callback(f"({completed}/{total}) Zadania wsadowe: {statuses}")
+        if all(batch.status in BATCH_FINAL_STATUSES for batch in batches):
+            return batches
+        deadline = time.monotonic() + poll_interval
+        while time.monotonic() < deadline:
+            if should_stop_callback():
+                return None
+            time.sleep(min(1.0, poll_interval))
+
+def download_batch_results(client, batches, stage, progress_callback, errors=None):
+    """
+    Zwraca {klucz produktu: treść odpowiedzi modelu} z plików wynikowych zadań.
+    Błędne zapytania są pomijane, a ich opisy trafiają do `errors` ({klucz produktu: błąd}), jeśli go podano.
+    """
+    contents, failed = {}, 0
+    prefix = f"{stage}-"
+    for batch in batches:
+        if batch.status != "completed":
+            progress_callback(f"BŁĄD: Zadanie wsadowe {batch.id} zakończyło się ze statusem '{batch.status}'.")
+        if not batch.output_file_id:
+            continue
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip(): continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                failed += 1
+                if errors is not None:
+                    error = result.get("error") or (response.get("body") or {}).get("error") or {}
+                    errors[result["custom_id"][len(prefix):]] = error.get("message") or f"HTTP {response.get('status_code')}"
+                continue
+            contents[result["custom_id"][len(prefix):]] = response["body"]["choices"][0]["message"]["content"]
+    if failed:
+        progress_callback(f"Ostrzeżenie: {failed} zapytań w zadaniach wsadowych zakończyło się błędem.")
+    return contents
+
+def build_feature_requests(df_todo, id_column, description_column, progress_callback=None):
+    """Zapytania o cechy ({ID produktu jako tekst: zapytanie}) dla produktów z wystarczająco długim opisem."""
+    requests_by_id = {}
+    for _, row in df_todo.iterrows():
+        clean_text = row_clean_text(row, description_column)
+        if not clean_text or len(clean_text) < 20:
+            if progress_callback:
+                progress_callback(f"[ID: {row.get(id_column)}] Pomijam: Opis jest zbyt krótki lub pusty.")
+            continue
+        requests_by_id[str(row.get(id_column))] = build_features_request(clean_text)
+    return requests_by_id
+
+def run_description_batch(client, df_todo, user_prompt, use_html_frame, frame_color, id_column, description_column, output_path, progress_callback, should_stop_callback, feature_cache=None, failed_path=None):
+    """
+    Tryb wsadowy (Batch API): ekstrakcja cech i treść kreatywna są wysyłane jako dwa zadania wsadowe (JSONL),
+    a wyniki trafiają do pliku wynikowego po zakończeniu drugiego etapu. Stan zadań jest zapisywany obok pliku wynikowego,
+    więc po przerwaniu ponowne uruchomienie pobiera wyniki zadań, które już wysłano.
+    Zapytania zakończone błędem trafiają do pliku `failed_path` zamiast do pliku wynikowego, więc kolejne uruchomienie je ponowi.
+    """
+    product_ids = {str(product_id): product_id for product_id in df_todo[id_column]}
+    state_path = batch_state_path(output_path)
+    failed_path = failed_path or default_failed_path(output_path)
+    run_started = time.strftime("%Y-%m-%d %H:%M:%S")
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+        progress_callback(f"Wznawiam tryb wsadowy (etap: {state.get('stage')}).")
+    failed_writer = BufferedResultWriter(failed_path, id_column, write_index=False)
+
+    def record_failures(keys, stage, errors):
+        for key in keys:
+            failed_writer.write(failed_product_row(
+                id_column, product_ids.get(key, key), stage, "BatchRequestError",
+                errors.get(key, "Brak odpowiedzi w wynikach zadania wsadowego."), 1, run_started
+            ))
+        if keys:
+            progress_callback(f"BŁĄD: {len(keys)} produktów ({stage}) zapisano w pliku nieudanych: {failed_path}")
+
+    if state.get('stage') != 'creative':
+        if state.get('stage') != 'features':
+            requests_by_id = build_feature_requests(df_todo, id_column, description_column, progress_callback)
+            if not requests_by_id:
+                progress_callback("Brak produktów z opisem do analizy.")
+                return output_path
+            cached = feature_cache.get_many(requests_by_id) if feature_cache else {}
+            if cached:
+                progress_callback(f"Pamięć podręczna: cechy {len(cached)} produktów wyodrębniono wcześniej.")
+            requests_to_send = {key: request for key, request in requests_by_id.items() if key not in cached}
+            batch_ids = []
+            if requests_to_send:
+                progress_callback(f"Etap 1/2: Wysyłam ekstrakcję cech dla {len(requests_to_send)} produktów jako zadanie wsadowe...")
+                batch_ids = submit_batches(client, requests_to_send, 'features', progress_callback)
+            state = {'stage': 'features', 'cached': cached, 'batch_ids': batch_ids}
+            save_batch_state(output_path, state)
+
+        features_by_id = dict(state.get('cached', {}))
+        if state['batch_ids']:
+            batches = wait_for_batches(client, state['batch_ids'], progress_callback, should_stop_callback)
+            if batches is None:
+                progress_callback("Przerwano. Zadania wsadowe działają dalej - uruchom generator ponownie, aby pobrać wyniki.")
+                return None
+            feature_errors = {}
+            downloaded = {key: parse_features(content) for key, content in download_batch_results(client, batches, 'features', progress_callback, feature_errors).items()}
+            requests_by_id = build_feature_requests(df_todo, id_column, description_column)
+            if feature_cache:
+                feature_cache.put_many((requests_by_id[key], features) for key, features in downloaded.items() if key in requests_by_id)
+            with failed_writer:
+                record_failures([key for key in requests_by_id if key not in features_by_id and key not in downloaded], "ekstrakcja cech", feature_errors)
+            features_by_id.update(downloaded)
+        features_by_id = {key: features for key, features in features_by_id.items() if features}
+        progress_callback(f"Wyodrębniono cechy dla {len(features_by_id)} produktów.")
+        if not features_by_id:
+            os.remove(state_path)
+            return output_path
+
+        progress_callback(f"Etap 2/2: Wysyłam generowanie treści dla {len(features_by_id)} produktów jako zadanie wsadowe...")
+        requests_by_id = {key: build_creative_request(features, user_prompt) for key, features in features_by_id.items()}
+        state = {'stage': 'creative', 'products': list(features_by_id), 'batch_ids': submit_batches(client, requests_by_id, 'creative', progress_callback)}
+        save_batch_state(output_path, state)
+
+    batches = wait_for_batches(client, state['batch_ids'], progress_callback, should_stop_callback)
+    if batches is None:
+        progress_callback("Przerwano. Zadania wsadowe działają dalej - uruchom generator ponownie, aby pobrać wyniki.")
+        return None
+    creative_errors = {}
+    contents = download_batch_results(client, batches, 'creative', progress_callback, creative_errors)
+
+    result_rows, failed_keys = [], []
+    for key in state['products']:
+        if key not in contents:
+            failed_keys.append(key)
+            continue
+        try:
+            creative_content = json.loads(contents[key])
+        except json.JSONDecodeError:
+            creative_errors[key] = "Model zwrócił niepoprawny JSON."
+            failed_keys.append(key)
+            continue
+        result_rows.append(build_result_row(product_ids.get(key, key), creative_content, use_html_frame, frame_color, id_column))
+
+    with failed_writer:
+        record_failures(failed_keys, "treść kreatywna", creative_errors)
+    with BufferedResultWriter(output_path, id_column, flush_rows=len(result_rows) or 1) as writer:
+        for row in result_rows:
+            writer.write(row)
+    os.remove(state_path)
+    progress_callback(f"Sukces: Zapisano {len(result_rows)} opisów z trybu wsadowego (nieudane: {len(failed_keys)}).")
+    return output_path
+
+def run_description_pipeline(client, df_todo, user_prompt, use_html_frame, frame_color, id_column, description_column, output_path, progress_callback, should_stop_callback, max_concurrency, requests_per_minute, tokens_per_minute, feature_cache=None, products_per_request=PRODUCTS_PER_FEATURES_REQUEST, failed_path=None):
+    """
+    Przetwarza produkty równolegle (do `max_concurrency` paczek naraz) w limitach zapytań i tokenów na minutę.
+    Paczka to `products_per_request` produktów, których cechy są wyodrębniane jednym zapytaniem.
+    Produkty, których nie udało się przetworzyć, trafiają do pliku `failed_path` (z etapem i treścią błędu)
+    zamiast do pliku wynikowego, więc kolejne uruchomienie spróbuje je przetworzyć ponownie.
+    """
+    total_rows = len(df_todo)
+    max_concurrency = max(1, max_concurrency)
+    budgets = {
+        FEATURES_MODEL: RequestBudget(requests_per_minute, tokens_per_minute),
+        CREATIVE_MODEL: RequestBudget(requests_per_minute, tokens_per_minute)
+    }
+    products_per_request = min(max(1, products_per_request), MAX_PRODUCTS_PER_FEATURES_REQUEST)
+    progress_callback(f"Przetwarzanie równoległe: do {max_concurrency} zadań naraz, limit {requests_per_minute} zapytań i {tokens_per_minute} tokenów na minutę.")
+    if products_per_request > 1:
+        progress_callback(f"Cechy są wyodrębniane dla {products_per_request} produktów w jednym zapytaniu.")
+
+    # Do puli trafia tylko tyle paczek, ile może być przetwarzanych naraz - zatrzymanie nie czeka na całą kolejkę
+    rows = (row for _, row in df_todo.iterrows())
+    done = 0
+    failed_path = failed_path or default_failed_path(output_path)
+    run_started = time.strftime("%Y-%m-%d %H:%M:%S")
+    failed_writer = BufferedResultWriter(failed_path, id_column, write_index=False)
+    failed_count = 0
+    aborted = False
+
+    def record_failure(product_id, stage, error, attempts):
+        nonlocal failed_count
+        failed_count += 1
+        failed_writer.write(failed_product_row(id_column, product_id, stage, type(error).__name__, str(error), attempts, run_started))
+
+    with failed_writer, BufferedResultWriter(output_path, id_column) as writer, ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = {}
+        while True:
+            while len(in_flight) < max_concurrency and not aborted and not should_stop_callback():
+                group = list(islice(rows, products_per_request))
+                if not group: break
+                future = executor.submit(
+                    process_product_group, client, budgets, group, user_prompt, use_html_frame, frame_color,
+                    id_column, description_column, progress_callback, should_stop_callback, feature_cache
+                )
+                in_flight[future] = [row.get(id_column) for row in group]
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                group_ids = in_flight.pop(future)
+                try:
+                    group_results = future.result()
+                except Exception as e:
+                    done += len(group_ids)
+                    progress_callback(f"({done}/{total_rows}) BŁĄD: Nieoczekiwany błąd dla produktów ID: {', '.join(map(str, group_ids))}: {e}")
+                    for product_id in group_ids:
+                        record_failure(product_id, "przetwarzanie", e, 1)
+                    continue
+                for product_id, result_row, error in group_results:
+                    done += 1
+                    if error is not None:
+                        record_failure(product_id, error.stage, error.error, error.attempts)
+                        progress_callback(f"({done}/{total_rows}) BŁĄD: Nie udało się przetworzyć produktu ID: {product_id} ({error.stage}, prób: {error.attempts}): {error}")
+                        if error.fatal and not aborted:
+                            aborted = True
+                            progress_callback("BŁĄD KRYTYCZNY: API odrzuca klucz lub dostęp do modelu. Przerywam - sprawdź klucz API i uruchom generator ponownie.")
+                        continue
+                    if result_row is None:
+                        if not should_stop_callback():
+                            progress_callback(f"({done}/{total_rows}) Pomijam produkt ID: {product_id} z powodu braku cech.")
+                        continue
+                    if result_row['nowy_opis_html'] == "BŁĄD":
+                        progress_callback(f"({done}/{total_rows}) BŁĄD: Nie udało się wygenerować treści dla produktu ID: {product_id}")
+                    else:
+                        progress_callback(f"({done}/{total_rows}) Sukces: Wygenerowano opis dla produktu ID: {product_id}")
+
+                    writer.write(result_row)
+
+    if should_stop_callback():
+        progress_callback("Przerwano przez użytkownika.")
+    if failed_count:
+        progress_callback(f"Nieudane produkty ({failed_count}) zapisano w pliku: {failed_path}. Zostaną ponowione przy kolejnym uruchomieniu.")
+
+    progress_callback(f"\n--- Zakończono! ---")
+    progress_callback(f"Wszystkie produkty zostały przetworzone.")
+    progress_callback(f"Wyniki znajdują się w pliku: {output_path}")
+    return output_path
+
+def run_description_generator(api_key, input_path, user_prompt, use_html_frame, frame_color, id_column, description_column, progress_callback, should_stop_callback, max_concurrency=MAX_CONCURRENT_PRODUCTS, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE, use_batch_api=False, base_url="", use_feature_cache=True, products_per_request=PRODUCTS_PER_FEATURES_REQUEST):
     progress_callback("--- Rozpoczynam tworzenie nowych opisów produktów (Silnik: OpenAI) ---")
     
     try:
-        client = openai.OpenAI(api_key=api_key)
+        # Własny adres API pozwala użyć serwera zgodnego z OpenAI (np. lokalnego serwera testowego)
+        # Ponawianiem zajmuje się generator (call_with_retries), więc wbudowane ponowienia klienta są wyłączone
+        client = openai.OpenAI(api_key=api_key, base_url=base_url or None, max_retries=0)
         progress_callback("Pomyślnie połączono z API OpenAI.")
     except Exception as e:
         progress_callback(f"BŁĄD KRYTYCZNY: Nie udało się połączyć z API OpenAI. Sprawdź klucz. Błąd: {e}")
@@ -153,80 +803,40 @@ def run_description_generator(api_key, input_path, user_prompt, use_html_frame,
     if os.path.exists(output_path):
         progress_callback("Znaleziono istniejący plik wyjściowy. Wznawiam pracę...")
         try:
-            df_processed = pd.read_csv(output_path)
-            if not df_processed.empty and id_column in df_processed.columns:
-                processed_ids = set(df_processed[id_column].dropna().tolist())
+            processed_ids = load_processed_ids(output_path, id_column)
             progress_callback(f"Znaleziono {len(processed_ids)} już przetworzonych produktów.")
-        except (pd.errors.EmptyDataError, KeyError):
+        except (pd.errors.EmptyDataError, ValueError, KeyError):
             progress_callback("Plik wyjściowy jest pusty lub uszkodzony. Zaczynam od początku.")
-            if os.path.exists(output_path): os.remove(output_path)
+            remove_output(output_path)
 
-    df_todo = df_full[~df_full[id_column].isin(processed_ids)].copy()
+    # Nieudane produkty są dopisywane do pliku między przebiegami; znikają z niego dopiero po udanym ponowieniu
+    failed_path = f"{base}{FAILED_OUTPUT_SUFFIX}{ext}"
+    prune_failed_products(failed_path, output_path, id_column)
+
+    df_todo = df_full[~df_full[id_column].astype(str).isin(processed_ids)].copy()
     
     if df_todo.empty:
         progress_callback("Wszystkie produkty zostały już przetworzone. Kończę pracę.")
         return output_path
         
     progress_callback(f"Pozostało do przetworzenia: {len(df_todo)} produktów.")
-    
-    total_rows = len(df_todo)
-    for i, (index, row) in enumerate(df_todo.iterrows()):
-        if should_stop_callback():
-            progress_callback("Przerwano przez użytkownika.")
-            break
+    add_clean_texts(df_todo, description_column, progress_callback)
 
-        progress_callback(f"({i+1}/{total_rows}) Przetwarzam produkt ID: {row.get(id_column)}")
-        
-        clean_text = clean_html(row.get(description_column, ''))
-        
-        row_prefix = f"({i+1}/{total_rows})"
-        def prefixed_callback(msg):
-            progress_callback(f"{row_prefix} {msg}")
-
-        features = extract_features_with_ai(client, clean_text, prefixed_callback, should_stop_callback)
-        if not features:
-            # Check if we should stop after the feature extraction failed but before continuing
-            if should_stop_callback():
-                progress_callback("Przerwano przez użytkownika.")
-                break
-            progress_callback(f"({i+1}/{total_rows}) Pomijam produkt z powodu braku cech.")
-            continue
-
-        creative_content = generate_creative_content_with_ai(client, features, user_prompt, prefixed_callback, should_stop_callback)
-
-        result_row = { id_column: row.get(id_column) }
-        
-        if creative_content and isinstance(creative_content, dict):
-            product_name = creative_content.get('nazwa_produktu', 'Nowy Produkt')
-            
-            if use_html_frame:
-                final_description = create_product_html(
-                    product_name, 
-                    creative_content.get('zajawka', ''), 
-                    creative_content.get('opis_glowny', ''), 
-                    creative_content.get('cechy_marketingowe', []),
-                    frame_color
-                )
-            else:
-                zajawka = creative_content.get('zajawka', '')
-                opis_glowny = creative_content.get('opis_glowny', '')
-                cechy = "\n".join([f"- {feat}" for feat in creative_content.get('cechy_marketingowe', [])])
-                final_description = f"{product_name}\n\n{zajawka}\n\n{opis_glowny}\n\nCechy:\n{cechy}"
-
-            result_row['wygenerowana_nazwa'] = product_name
-            result_row['nowy_opis_html'] = final_description
-            progress_callback(f"({i+1}/{total_rows}) Sukces: Wygenerowano opis dla produktu ID: {row.get(id_column)}")
-        else:
-            result_row['wygenerowana_nazwa'] = "BŁĄD"
-            result_row['nowy_opis_html'] = "BŁĄD"
-            progress_callback(f"({i+1}/{total_rows}) BŁĄD: Nie udało się wygenerować treści dla produktu ID: {row.get(id_column)}")
-
-        df_to_save = pd.DataFrame([result_row])
-        df_to_save.to_csv(output_path, mode='a', header=not os.path.exists(output_path), index=False, encoding='utf-8')
-        
-        time.sleep(1)
-
-    progress_callback(f"\n--- Zakończono! ---")
-    progress_callback(f"Wszystkie produkty zostały przetworzone.")
-    progress_callback(f"Wyniki znajdują się w pliku: {output_path}")
-    return output_path
+    # Cechy zależą tylko od modelu i opisu, więc zmiana promptu kreatywnego nie wymaga ponownej ekstrakcji
+    feature_cache = FeatureCache(FEATURE_CACHE_FILE) if use_feature_cache else None
+    try:
+        if use_batch_api:
+            progress_callback("Tryb wsadowy (Batch API): wyniki pojawią się po zakończeniu zadań po stronie OpenAI (zwykle do kilku godzin).")
+            return run_description_batch(
+                client, df_todo, user_prompt, use_html_frame, frame_color, id_column, description_column,
+                output_path, progress_callback, should_stop_callback, feature_cache, failed_path
+            )
+        return run_description_pipeline(
+            client, df_todo, user_prompt, use_html_frame, frame_color, id_column, description_column, output_path,
+            progress_callback, should_stop_callback, max_concurrency, requests_per_minute, tokens_per_minute, feature_cache,
+            products_per_request, failed_path
+        )
+    finally:
+        if feature_cache:
+            feature_cache.close()
+        prune_failed_products(failed_path, output_path, id_column)
@@ -0,0 +1,77 @@
+import sqlite3
+import hashlib
+import threading
+import json
+
+FEATURE_CACHE_FILE = "feature_cache.sqlite"
+SQLITE_MAX_VARIABLES = 900  # bezpieczny limit parametrów w jednym zapytaniu SQLite
+
+def request_hash(request: dict) -> str:
+    """
+    Klucz zapytania o cechy: hash modelu i treści wiadomości (polecenie + oczyszczony opis).
+    Zmiana modelu, polecenia albo opisu daje nowy klucz, a zmiana promptu kreatywnego - nie.
+    """
+    key = json.dumps([request["model"], request["messages"]], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+class FeatureCache:
+    """
+    Trwała pamięć podręczna (SQLite) cech wyodrębnionych przez model, z kluczem `request_hash`.
+    Bezpieczna do użycia z wielu wątków.
+    """
+    def __init__(self, path: str = FEATURE_CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                " request_hash TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " features TEXT NOT NULL)"
+            )
+            self.connection.commit()
+
+    def get(self, request: dict) -> list[str] | None:
+        """Zwraca zapamiętane cechy dla zapytania albo None."""
+        return self.get_many({None: request}).get(None)
+
+    def get_many(self, requests_by_key: dict) -> dict:
+        """Zwraca {klucz: cechy} dla zapytań ({klucz: zapytanie}), których wyniki są już zapamiętane."""
+        keys_by_hash = {}
+        for key, request in requests_by_key.items():
+            keys_by_hash.setdefault(request_hash(request), []).append(key)
+
+        found = {}
+        hashes = list(keys_by_hash)
+        with self.lock:
+            for i in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                chunk = hashes[i:i + SQLITE_MAX_VARIABLES]
+                rows = self.connection.execute(
+                    f"SELECT request_hash, features FROM features WHERE request_hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for hash_value, features in rows:
+                    for key in keys_by_hash[hash_value]:
+                        found[key] = json.loads(features)
+        return found
+
+    def put(self, request: dict, features: list[str]) -> None:
+        self.put_many([(request, features)])
+
+    def put_many(self, pairs) -> None:
+        """Zapisuje pary (zapytanie, cechy). Puste listy cech są pomijane."""
+        rows = [
+            (request_hash(request), request["model"], json.dumps(features, ensure_ascii=False))
+            for request, features in pairs
+            if features
+        ]
+        if not rows:
+            return
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO features VALUES (?, ?, ?)", rows)
+            self.connection.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
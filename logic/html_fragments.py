@@ -0,0 +1,161 @@
+import re
+import os
+import html
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+from bs4 import BeautifulSoup, NavigableString
+
+SKIPPED_PARENT_TAGS = ['style', 'script', 'head', 'title', 'meta']
+# Znacznik miejsca na tekst w szablonie komórki (znak z prywatnego obszaru Unicode, nie występuje w opisach)
+TEXT_SLOT = '\ue000'
+CELLS_PER_CHUNK = 250  # tyle komórek trafia do procesu w jednym zadaniu
+MIN_CELLS_FOR_PROCESS_POOL = 1000  # przy mniejszych plikach start procesów kosztuje więcej, niż daje
+
+try:
+    # lxml (opcjonalnie) wyciąga tekst kilkanaście razy szybciej niż BeautifulSoup z html.parser
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+def _translatable_nodes(soup: BeautifulSoup) -> list[NavigableString]:
+    """Zwraca węzły tekstowe widoczne dla użytkownika (bez komentarzy, stylów, skryptów i pustych węzłów)."""
+    return [
+        node for node in soup.find_all(string=True)
+        if type(node) is NavigableString and node.parent.name not in SKIPPED_PARENT_TAGS and node.strip()
+    ]
+
+def split_long_text(text: str, character_limit: int) -> list[str]:
+    """Dzieli tekst dłuższy niż limit na kawałki zakończone na granicy zdań."""
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    sub_fragments = []
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) + 1 > character_limit:
+            if current_chunk: sub_fragments.append(current_chunk)
+            current_chunk = sentence
+        else:
+            current_chunk = f"{current_chunk} {sentence}" if current_chunk else sentence
+    if current_chunk: sub_fragments.append(current_chunk)
+    return sub_fragments
+
+def extract_cell(cell_content: str, character_limit: int) -> dict | None:
+    """
+    Parsuje komórkę jeden raz i zwraca strukturę potrzebną do tłumaczenia i ponownego złożenia:
+    - 'is_html': czy komórka zawiera znaczniki HTML,
+    - 'template': serializowany HTML podzielony w miejscach węzłów tekstowych (None dla zwykłego tekstu),
+    - 'nodes': dla każdego węzła lista fragmentów (tekst bez spacji, spacja na początku, spacja na końcu),
+    - 'split_nodes': liczba węzłów podzielonych na zdania, bo przekraczały limit znaków.
+    Zwraca None, jeśli w komórce nie ma nic do tłumaczenia.
+    """
+    soup = BeautifulSoup(cell_content, "html.parser")
+    text_nodes = _translatable_nodes(soup)
+    if not text_nodes:
+        return None
+
+    nodes, split_nodes = [], 0
+    for node in text_nodes:
+        original_text_node = str(node)
+        if len(original_text_node) > character_limit:
+            split_nodes += 1
+            parts = split_long_text(original_text_node, character_limit)
+        else:
+            parts = [original_text_node]
+        nodes.append([(part.strip(), part.startswith(' '), part.endswith(' ')) for part in parts])
+
+    is_html = bool(soup.find())
+    template = None
+    if is_html and TEXT_SLOT not in cell_content:
+        for node in text_nodes:
+            node.replace_with(TEXT_SLOT)
+        template = str(soup).split(TEXT_SLOT)
+
+    return {'is_html': is_html, 'template': template, 'nodes': nodes, 'split_nodes': split_nodes}
+
+def assemble_cell(is_html: bool, template: list[str] | None, node_counts: list[int], translated_parts: list[str], original_content: str = "") -> str:
+    """
+    Składa komórkę z przetłumaczonych fragmentów. `node_counts` mówi, ile fragmentów przypada na kolejne węzły tekstowe.
+    Gdy brak szablonu (bardzo rzadki przypadek znacznika w treści), oryginał jest parsowany ponownie.
+    """
+    node_texts, ptr = [], 0
+    for count in node_counts:
+        node_texts.append(" ".join(translated_parts[ptr:ptr + count]))
+        ptr += count
+
+    if not is_html:
+        return "".join(node_texts)
+
+    if template is None:
+        soup = BeautifulSoup(original_content, "html.parser")
+        for node, text in zip(_translatable_nodes(soup), node_texts):
+            node.replace_with(text)
+        return str(soup)
+
+    # Tekst w HTML jest escapowany tak samo jak przez BeautifulSoup (formatter "minimal")
+    pieces = [template[0]]
+    for text, piece in zip(node_texts, template[1:]):
+        pieces.append(html.escape(text, quote=False))
+        pieces.append(piece)
+    return "".join(pieces)
+
+def _lxml_text(cell_content: str) -> str:
+    """Odpowiednik `get_text(separator=' ', strip=True)` z BeautifulSoup: bez komentarzy, stylów i skryptów."""
+    try:
+        root = lxml_html.document_fromstring(cell_content)
+    except (etree.ParserError, ValueError):
+        return ""
+    parts = []
+    for element in root.iter():
+        if isinstance(element.tag, str) and element.tag not in ('style', 'script') and element.text:
+            parts.append(element.text)
+        if element.tail and element is not root:
+            parts.append(element.tail)
+    return " ".join(part.strip() for part in parts if part.strip())
+
+def html_to_text(cell_content) -> str:
+    """Widoczny tekst komórki (fragmenty rozdzielone spacją); pusty tekst dla wartości niebędących tekstem."""
+    if not isinstance(cell_content, str):
+        return ""
+    if '<' not in cell_content and '&' not in cell_content:
+        return cell_content.strip()  # zwykły tekst - parsowanie niczego by nie zmieniło
+    if lxml_html is not None:
+        return _lxml_text(cell_content)
+    return BeautifulSoup(cell_content, "html.parser").get_text(separator=' ', strip=True)
+
+def html_to_texts(cell_contents: list) -> list[str]:
+    """Wersja `html_to_text` dla paczki komórek (jedno zadanie puli procesów)."""
+    return [html_to_text(content) for content in cell_contents]
+
+def extract_cells(cell_contents: list[str], character_limit: int) -> list[dict | None]:
+    """Wersja `extract_cell` dla paczki komórek (jedno zadanie puli procesów)."""
+    return [extract_cell(content, character_limit) for content in cell_contents]
+
+def assemble_cells(jobs: list[tuple]) -> list[str]:
+    """Wersja `assemble_cell` dla paczki komórek; każde zadanie to krotka argumentów `assemble_cell`."""
+    return [assemble_cell(*job) for job in jobs]
+
+def create_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Tworzy pulę procesów do parsowania HTML (procesy startują dopiero przy pierwszym zadaniu).
+    "spawn" zamiast "fork" - proces z wątkami (Qt, wątki tłumaczące) nie powinien być forkowany.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+
+def process_in_chunks(func: Callable, items: list, *args, executor: ProcessPoolExecutor | None = None, chunk_size: int = CELLS_PER_CHUNK) -> Iterator[list]:
+    """
+    Wywołuje `func(paczka, *args)` dla kolejnych paczek `items` i zwraca wyniki paczka po paczce, w oryginalnej kolejności.
+    Duże zbiory są przetwarzane w podanej puli procesów (parsowanie HTML obciąża tylko CPU), małe - w bieżącym procesie.
+    """
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if executor is None or len(items) < MIN_CELLS_FOR_PROCESS_POOL or len(chunks) == 1:
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+
+    futures = [executor.submit(func, chunk, *args) for chunk in chunks]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,199 @@
+"""
+Lokalny serwer testowy zgodny z fragmentem API OpenAI: /v1/chat/completions, /v1/files i /v1/batches.
+Zamiast modelu zwraca przewidywalne odpowiedzi, więc generator opisów (także w trybie wsadowym) i tłumacz
+z silnikiem OpenAI można sprawdzić bez klucza API i bez kosztów.
+
+Uruchomienie: python -m logic.local_openai_server --port 8765
+Adres API do wpisania w programie: http://127.0.0.1:8765/v1
+"""
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+BATCH_COMPLETION_DELAY = 0.0  # sekundy, po których zadanie wsadowe jest oznaczane jako zakończone
+
+def fake_completion_content(body: dict) -> str:
+    """Przewidywalna odpowiedź "modelu" na podstawie treści zapytania."""
+    messages = body.get("messages", [])
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if '"translations"' in system:  # silnik tłumaczeń OpenAI - teksty wracają bez zmian
+        return json.dumps({"translations": json.loads(user)}, ensure_ascii=False)
+    if '"produkty"' in user:  # cechy kilku produktów naraz
+        texts_by_id = json.loads(user[user.index("Opisy:") + len("Opisy:"):])
+        return json.dumps({"produkty": {
+            product_id: [part.strip() for part in re.split(r"[.,;\n]", text) if part.strip()][:5]
+            for product_id, text in texts_by_id.items()
+        }}, ensure_ascii=False)
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        features = user.split(":")[-1].strip(" .")
+        return json.dumps({
+            "nazwa_produktu": "Produkt testowy",
+            "zajawka": "Odpowiedź lokalnego serwera testowego.",
+            "opis_glowny": features[:300],
+            "cechy_marketingowe": [feature.strip() for feature in features.split(",") if feature.strip()][:5]
+        }, ensure_ascii=False)
+    description = user.split("---")[1] if user.count("---") >= 2 else user
+    parts = [part.strip() for part in re.split(r"[.,;\n]", description) if part.strip()]
+    return "\n".join(f"{i}. {part}" for i, part in enumerate(parts[:5], start=1))
+
+def fake_chat_completion(body: dict) -> dict:
+    content = fake_completion_content(body)
+    prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "local"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+class LocalOpenAIState:
+    """Pliki i zadania wsadowe trzymane w pamięci serwera."""
+    def __init__(self, batch_completion_delay: float = BATCH_COMPLETION_DELAY):
+        self.lock = threading.Lock()
+        self.files = {}  # id -> (nazwa, cel, zawartość)
+        self.batches = {}  # id -> obiekt zadania
+        self.batch_completion_delay = batch_completion_delay
+
+    def add_file(self, filename: str, purpose: str, content: bytes) -> dict:
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        with self.lock:
+            self.files[file_id] = (filename, purpose, content)
+        return self.file_object(file_id)
+
+    def file_object(self, file_id: str) -> dict:
+        filename, purpose, content = self.files[file_id]
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> dict:
+        _, _, content = self.files[input_file_id]
+        output_lines, completed, failed = [], 0, 0
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip(): continue
+            request = json.loads(line)
+            try:
+                body = fake_chat_completion(request["body"])
+                output_lines.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"],
+                                     "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": body}, "error": None})
+                completed += 1
+            except Exception as e:
+                output_lines.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request.get("custom_id"),
+                                     "response": None, "error": {"code": "server_error", "message": str(e)}})
+                failed += 1
+        output_file = self.add_file("batch_output.jsonl", "batch_output",
+                                    "\n".join(json.dumps(line, ensure_ascii=False) for line in output_lines).encode("utf-8"))
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": endpoint, "input_file_id": input_file_id,
+            "completion_window": completion_window, "status": "in_progress", "created_at": int(time.time()),
+            "output_file_id": None, "error_file_id": None,
+            "request_counts": {"total": completed + failed, "completed": 0, "failed": 0},
+            "_ready_at": time.monotonic() + self.batch_completion_delay,
+            "_result": (output_file["id"], completed, failed)
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        return self.batch_object(batch_id)
+
+    def batch_object(self, batch_id: str) -> dict:
+        with self.lock:
+            batch = self.batches[batch_id]
+            if batch["status"] == "in_progress" and time.monotonic() >= batch["_ready_at"]:
+                output_file_id, completed, failed = batch["_result"]
+                batch.update(status="completed", output_file_id=output_file_id, completed_at=int(time.time()))
+                batch["request_counts"] = {"total": completed + failed, "completed": completed, "failed": failed}
+            return {key: value for key, value in batch.items() if not key.startswith("_")}
+
+class LocalOpenAIHandler(BaseHTTPRequestHandler):
+    state: LocalOpenAIState = None
+
+    def log_message(self, format, *args):
+        pass  # bez logowania każdego zapytania na konsolę
+
+    def send_json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        try:
+            if path == "/v1/chat/completions":
+                self.send_json(fake_chat_completion(json.loads(self.read_body())))
+            elif path == "/v1/files":
+                content_type = self.headers.get("Content-Type", "")
+                message = BytesParser(policy=default_policy).parsebytes(
+                    f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + self.read_body()
+                )
+                fields, filename, content = {}, "upload.jsonl", b""
+                for part in message.iter_parts():
+                    name = part.get_param("name", header="content-disposition")
+                    if part.get_filename():
+                        filename, content = part.get_filename(), part.get_payload(decode=True)
+                    else:
+                        fields[name] = part.get_content().strip()
+                self.send_json(self.state.add_file(filename, fields.get("purpose", "batch"), content))
+            elif path == "/v1/batches":
+                body = json.loads(self.read_body())
+                self.send_json(self.state.create_batch(body["input_file_id"], body["endpoint"], body.get("completion_window", "24h")))
+            else:
+                self.send_json({"error": {"message": f"Nieobsługiwany adres: {path}"}}, 404)
+        except KeyError as e:
+            self.send_json({"error": {"message": f"Nie znaleziono: {e}"}}, 404)
+        except Exception as e:
+            self.send_json({"error": {"message": str(e)}}, 400)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        try:
+            if match := re.fullmatch(r"/v1/batches/([\w-]+)", path):
+                self.send_json(self.state.batch_object(match.group(1)))
+            elif match := re.fullmatch(r"/v1/files/([\w-]+)/content", path):
+                _, _, content = self.state.files[match.group(1)]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            elif match := re.fullmatch(r"/v1/files/([\w-]+)", path):
+                self.send_json(self.state.file_object(match.group(1)))
+            else:
+                self.send_json({"error": {"message": f"Nieobsługiwany adres: {path}"}}, 404)
+        except KeyError as e:
+            self.send_json({"error": {"message": f"Nie znaleziono: {e}"}}, 404)
+
+def create_local_server(host: str = "127.0.0.1", port: int = DEFAULT_PORT, batch_completion_delay: float = BATCH_COMPLETION_DELAY) -> ThreadingHTTPServer:
+    """Tworzy serwer (port 0 - dowolny wolny port). Uruchomienie: `server.serve_forever()`, zwykle w osobnym wątku."""
+    handler = type("Handler", (LocalOpenAIHandler,), {"state": LocalOpenAIState(batch_completion_delay)})
+    return ThreadingHTTPServer((host, port), handler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny serwer testowy zgodny z API OpenAI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--batch-delay", type=float, default=BATCH_COMPLETION_DELAY, help="czas realizacji zadania wsadowego w sekundach")
+    args = parser.parse_args()
+    server = create_local_server(args.host, args.port, args.batch_delay)
+    print(f"Serwer testowy działa: http://{args.host}:{server.server_port}/v1 (Ctrl+C kończy pracę)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
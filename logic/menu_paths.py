@@ -0,0 +1,83 @@
+import requests
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Tuple, Dict
+
+API_ENDPOINT_PATH = "/api/admin/v7/menu/menu"
+MAX_FETCH_WORKERS = 4
+
+def build_item_paths(items: list[dict[str, Any]]) -> Dict[Any, str]:
+    """
+    Buduje ścieżkę "Rodzic/Dziecko/Wnuk" (nazwy z pierwszego wpisu lang_data) dla każdego elementu menu: item_id -> ścieżka.
+    Elementy bez item_id lub lang_data są pomijane; ich dzieci zaczynają ścieżkę od własnej nazwy.
+    """
+    items_by_id = {item['item_id']: item for item in items if 'item_id' in item and item.get('lang_data')}
+    # Cache dla zbudowanych ścieżek, aby unikać wielokrotnego obliczania
+    path_cache = {}
+
+    def get_path(item_id) -> str:
+        if item_id in path_cache:
+            return path_cache[item_id]
+        item = items_by_id[item_id]
+        name = item['lang_data'][0].get('name', '')
+        parent_id = item.get('parent_id')
+        path = f"{get_path(parent_id)}/{name}" if parent_id in items_by_id else name
+        path_cache[item_id] = path
+        return path
+
+    return {item_id: get_path(item_id) for item_id in items_by_id}
+
+def build_path_index(items: list[dict[str, Any]]) -> Tuple[Dict[str, dict[str, Any]], Dict[str, list]]:
+    """
+    Buduje indeks 'Rodzic/Dziecko/Wnuk' -> element menu.
+    Zwraca też kolizje: ścieżki, pod którymi występuje więcej niż jeden element (ścieżka -> lista item_id).
+    Ścieżki z kolizjami nie trafiają do indeksu, bo nie da się ich jednoznacznie dopasować.
+    """
+    items_by_id = {item['item_id']: item for item in items if 'item_id' in item}
+    items_by_path = defaultdict(list)
+    for item_id, path in build_item_paths(items).items():
+        items_by_path[path].append(items_by_id[item_id])
+
+    path_index = {path: path_items[0] for path, path_items in items_by_path.items() if len(path_items) == 1}
+    collisions = {path: [item['item_id'] for item in path_items] for path, path_items in items_by_path.items() if len(path_items) > 1}
+    return path_index, collisions
+
+def get_menu_data(base_url: str, api_key: str, shop_id: str, menu_id: str, lang_id: str) -> dict[str, Any] | None:
+    """Pobiera dane o menu dla danego sklepu, ID menu i języka."""
+    url = f"{base_url}{API_ENDPOINT_PATH}?shop_id={shop_id}&menu_id={menu_id}&lang_id={lang_id}"
+    headers = {
+        "accept": "application/json",
+        "X-API-KEY": api_key
+    }
+    
+    try:
+        response = requests.get(url, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        
+        if "result" in data and data["result"]:
+            return data["result"]
+        else:
+            return None
+            
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Błąd podczas pobierania danych dla sklepu ID: {shop_id}. Błąd: {e}") from e
+
+def parse_lang_ids(lang_ids: str | list[str]) -> list[str]:
+    """Zamienia 'eng, cze ger' lub listę kodów na listę unikalnych kodów języków (z zachowaniem kolejności)."""
+    if isinstance(lang_ids, str):
+        lang_ids = re.split(r'[\s,;]+', lang_ids)
+    return list(dict.fromkeys(lang.strip() for lang in lang_ids if lang and lang.strip()))
+
+def fetch_menu_trees(base_url: str, api_key: str, requests_to_make: dict[str, Tuple[str, str, str]]) -> dict[str, list[dict[str, Any]] | None]:
+    """
+    Pobiera równolegle kilka drzew menu. `requests_to_make` mapuje dowolny klucz na (shop_id, menu_id, lang_id).
+    Zwraca słownik z tymi samymi kluczami. W razie błędu któregokolwiek zapytania rzuca RuntimeError.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = {
+            key: executor.submit(get_menu_data, base_url, api_key, shop_id, menu_id, lang_id)
+            for key, (shop_id, menu_id, lang_id) in requests_to_make.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
@@ -0,0 +1,156 @@
+import requests
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Generator, Any
+
+from .rate_limiter import RateLimiter
+
+API_ENDPOINT_PATH = "/api/admin/v7/menu/menu"
+BATCH_SIZE = 100
+MAX_WORKERS = 3
+REQUESTS_PER_SECOND = 2.0
+REQUEST_TIMEOUT = 120  # sekundy; opisy HTML potrafią być duże
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 5  # sekundy, podwajane przy każdej kolejnej próbie
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+VALIDATION_STATUS_CODES = {400, 422}  # tylko wtedy paczkę warto dzielić - winna może być pojedyncza pozycja
+
+def _item_label(item: dict[str, Any]) -> str:
+    return f"item_id {item.get('item_id', '?')}"
+
+def _retry_delay(attempt: int, response: requests.Response | None) -> float:
+    """Czas oczekiwania przed kolejną próbą: nagłówek Retry-After, a jeśli go brak - wykładniczy backoff z losowym rozrzutem."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, 1)
+
+def _send_batch(url: str, headers: dict[str, str], batch: list[dict[str, Any]], label: str, limiter: RateLimiter, abort_event: threading.Event) -> dict[str, Any]:
+    """
+    Wysyła jedną paczkę `menu_list` z ponawianiem błędów przejściowych.
+    Zwraca słownik: 'messages', 'succeeded' (liczba pozycji), 'failed' (lista (pozycja, błąd)) oraz 'split' (paczki do ponownego wysłania).
+    Błąd, który dotyczy całej wysyłki (np. 401/403/404, błędny adres), ustawia `abort_event` - kolejne paczki nie są już wysyłane.
+    """
+    outcome = {'messages': [], 'succeeded': 0, 'failed': [], 'split': []}
+    last_error = ""
+    if abort_event.is_set():
+        outcome['failed'] = [(item, "Nie wysłano - wysyłkę przerwano po błędzie krytycznym.") for item in batch]
+        return outcome
+
+    for attempt in range(MAX_RETRIES):
+        response = None
+        limiter.wait()
+        try:
+            response = requests.put(url, json={"menu_list": batch}, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code in TRANSIENT_STATUS_CODES:
+                raise requests.exceptions.HTTPError(f"{response.status_code} {response.reason}", response=response)
+            response.raise_for_status()
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as e:
+            is_transient = response is None or response.status_code in TRANSIENT_STATUS_CODES
+            last_error = f"{e}" + (f"\nTreść odpowiedzi błędu: {response.text}" if response is not None else "")
+            if not is_transient:
+                break
+            if attempt < MAX_RETRIES - 1:
+                delay = _retry_delay(attempt, response)
+                outcome['messages'].append(f"⏳ {label}: błąd przejściowy (próba {attempt + 1}/{MAX_RETRIES}): {e}. Ponawiam za {delay:.0f}s...")
+                time.sleep(delay)
+            continue
+        except requests.exceptions.RequestException as e:
+            last_error = str(e)
+            break
+
+        # Sukces HTTP - sprawdzamy ewentualne błędy pojedynczych pozycji
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        results = body.get('result', []) if isinstance(body, dict) else []
+        if isinstance(results, list) and len(results) == len(batch):
+            for item, result in zip(batch, results):
+                if isinstance(result, dict) and result.get("faultCode", 0) != 0:
+                    outcome['failed'].append((item, f"{result.get('faultCode')}: {result.get('faultString', '')}"))
+                else:
+                    outcome['succeeded'] += 1
+        else:
+            outcome['succeeded'] = len(batch)
+        if outcome['failed']:
+            outcome['messages'].append(f"⚠️ {label}: zaktualizowano {outcome['succeeded']}/{len(batch)} pozycji, {len(outcome['failed'])} odrzucono.")
+        else:
+            outcome['messages'].append(f"✅ {label} zaktualizowana pomyślnie ({len(batch)} pozycji)!")
+        return outcome
+    else:
+        outcome['failed'] = [(item, f"Nie udało się po {MAX_RETRIES} próbach. {last_error}") for item in batch]
+        outcome['messages'].append(f"❌ Błąd podczas aktualizacji: {label}. Wyczerpano {MAX_RETRIES} prób. Błąd: {last_error}")
+        return outcome
+
+    if response is None or response.status_code not in VALIDATION_STATUS_CODES:
+        # Błędny klucz, brak uprawnień, zły adres - każda kolejna paczka skończyłaby się tak samo
+        abort_event.set()
+        outcome['failed'] = [(item, last_error) for item in batch]
+        outcome['messages'].append(f"❌ {label}: błąd krytyczny, przerywam wysyłkę. Błąd: {last_error}")
+        return outcome
+
+    # Paczka odrzucona w całości przez walidację (winna może być jedna pozycja) - dzielimy ją na pół, aby wyizolować wadliwe pozycje
+    if len(batch) > 1:
+        middle = len(batch) // 2
+        outcome['split'] = [batch[:middle], batch[middle:]]
+        outcome['messages'].append(f"✂️ {label} odrzucona ({last_error.splitlines()[0] if last_error else 'brak szczegółów'}). Dzielę na paczki po {middle} i {len(batch) - middle} pozycji...")
+    else:
+        outcome['failed'] = [(batch[0], last_error)]
+        outcome['messages'].append(f"❌ Pozycja {_item_label(batch[0])} odrzucona przez API. Błąd: {last_error}")
+    return outcome
+
+def send_menu_list_batches(
+    base_url: str,
+    api_key: str,
+    payload_list: list[dict[str, Any]],
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+    requests_per_second: float = REQUESTS_PER_SECOND
+) -> Generator[str, None, None]:
+    """
+    Wysyła elementy `menu_list` (PUT /menu/menu) w paczkach, równolegle w kilku wątkach ze wspólnym limitem zapytań.
+    Błędy przejściowe (timeout, 429, 5xx) są ponawiane z backoffem, paczki odrzucone przez walidację (400/422) są dzielone,
+    aż do wyizolowania wadliwych pozycji, a pozostałe błędy (np. 401/403/404) przerywają całą wysyłkę.
+    """
+    url = f"{base_url}{API_ENDPOINT_PATH}"
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "X-API-KEY": api_key
+    }
+
+    total_items = len(payload_list)
+    batches = [payload_list[i:i + batch_size] for i in range(0, total_items, batch_size)]
+    limiter = RateLimiter(requests_per_second)
+    abort_event = threading.Event()
+    succeeded, failed = 0, []
+
+    yield f"🚀 Wysyłanie {total_items} pozycji w {len(batches)} paczkach ({max_workers} wątki, maks. {requests_per_second} zapytań/s)..."
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(_send_batch, url, headers, batch, f"Paczka {i + 1}/{len(batches)}", limiter, abort_event)
+            for i, batch in enumerate(batches)
+        }
+        split_counter = 0
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                yield from outcome['messages']
+                succeeded += outcome['succeeded']
+                failed.extend(outcome['failed'])
+                for sub_batch in outcome['split']:
+                    split_counter += 1
+                    pending.add(executor.submit(_send_batch, url, headers, sub_batch, f"Podpaczka {split_counter} ({len(sub_batch)} pozycji)", limiter, abort_event))
+
+    if failed:
+        yield f"❌ Zaktualizowano {succeeded}/{total_items} pozycji. Nie udało się zaktualizować {len(failed)} pozycji:"
+        for item, error in failed:
+            yield f"   - {_item_label(item)}: {error}"
+    else:
+        yield f"✅ Zaktualizowano wszystkie {succeeded} pozycji."
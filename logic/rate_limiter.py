@@ -0,0 +1,49 @@
+import time
+import threading
+
+class RateLimiter:
+    """
+    Limiter wspólny dla wątków: wszystkie wątki razem wysyłają najwyżej `requests_per_second` zapytań na sekundę
+    (0 lub mniej - bez limitu). Tempo jest stałe, dopóki wywołujący nie zgłasza wyników:
+    po SUCCESSES_BEFORE_SPEEDUP wywołaniach on_success() przyspiesza o 10% tempa startowego (do `max_rate`,
+    domyślnie dwukrotności), a po on_rate_limited() zwalnia o połowę (do 1/8 tempa startowego)
+    i wstrzymuje wszystkie wątki na `cooldown` sekund.
+    """
+    SUCCESSES_BEFORE_SPEEDUP = 10
+
+    def __init__(self, requests_per_second: float, max_rate: float | None = None, cooldown: float = 0.0):
+        self.rate = requests_per_second
+        self.step = requests_per_second / 10
+        self.min_rate = requests_per_second / 8
+        self.max_rate = max_rate or requests_per_second * 2
+        self.cooldown = cooldown
+        self.successes = 0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        # Każdy wątek rezerwuje własny termin, a czeka już poza blokadą
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_success(self):
+        with self.lock:
+            self.successes += 1
+            if self.successes >= self.SUCCESSES_BEFORE_SPEEDUP:
+                self.successes = 0
+                self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_rate_limited(self) -> float:
+        """Zwalnia tempo po odrzuceniu z powodu limitu i zwraca nowe tempo (zapytań na sekundę)."""
+        with self.lock:
+            self.successes = 0
+            self.rate = max(self.min_rate, self.rate / 2)
+            if self.rate > 0:
+                self.next_slot = max(self.next_slot, time.monotonic() + self.cooldown) + 1.0 / self.rate
+            return self.rate
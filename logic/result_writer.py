@@ -0,0 +1,78 @@
+import os
+import time
+import pandas as pd
+
+FLUSH_ROWS = 50  # zapis na dysk co tyle wierszy...
+FLUSH_INTERVAL = 10.0  # ...albo co tyle sekund, zależnie od tego, co nastąpi wcześniej
+PROCESSED_INDEX_SUFFIX = ".ids"  # indeks przetworzonych ID obok pliku wynikowego (jedno ID w wierszu)
+
+def processed_index_path(output_path):
+    return output_path + PROCESSED_INDEX_SUFFIX
+
+def load_processed_ids(output_path, id_column):
+    """
+    Zwraca zbiór ID (jako tekst) produktów zapisanych już w pliku wynikowym.
+    Czyta lekki indeks obok pliku; gdy go brak lub jest starszy niż plik wynikowy (np. przerwany zapis),
+    odbudowuje go z samej kolumny ID pliku wynikowego.
+    """
+    index_path = processed_index_path(output_path)
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        remove_output(output_path)  # indeks bez pliku wynikowego pochodzi z poprzedniego przebiegu
+        return set()
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(output_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return {line.rstrip('\n') for line in f if line.strip()}
+
+    df_ids = pd.read_csv(output_path, usecols=[id_column], dtype=str)
+    processed_ids = set(df_ids[id_column].dropna())
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.writelines(f"{product_id}\n" for product_id in processed_ids)
+    return processed_ids
+
+def remove_output(output_path):
+    for path in (output_path, processed_index_path(output_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+class BufferedResultWriter:
+    """
+    Dopisuje wiersze wynikowe do pliku CSV paczkami (co `flush_rows` wierszy lub `flush_interval` sekund)
+    i po każdym zapisie uzupełnia indeks przetworzonych ID (o ile `write_index`). Nagłówek jest dopisywany tylko do nowego pliku.
+    """
+    def __init__(self, output_path, id_column, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL, write_index=True):
+        self.output_path = output_path
+        self.index_path = processed_index_path(output_path) if write_index else None
+        self.id_column = id_column
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        if self.write_header and self.index_path and os.path.exists(self.index_path):
+            os.remove(self.index_path)  # nowy plik wynikowy - indeks nie może zawierać ID z poprzedniego
+        self.last_flush = time.monotonic()
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.rows:
+            return
+        pd.DataFrame(self.rows).to_csv(self.output_path, mode='a', header=self.write_header, index=False, encoding='utf-8')
+        # Indeks po pliku wynikowym - przerwanie między zapisami zostawia indeks starszy niż plik, więc zostanie odbudowany
+        if self.index_path:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.writelines(f"{row.get(self.id_column)}\n" for row in self.rows)
+        self.write_header = False
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,169 @@
+import json
+import time
+import requests
+import openai
+from deep_translator import GoogleTranslator
+
+REQUEST_TIMEOUT = 60  # sekundy
+
+class RateLimitError(RuntimeError):
+    """Serwis odrzucił zapytanie z powodu limitu. Komunikat zawiera frazę 'too many requests', tak jak błędy Google."""
+
+class TranslationBackend:
+    """
+    Wspólny interfejs silników tłumaczeń. Atrybuty klasy opisują limity silnika,
+    według których tłumacz dzieli teksty na paczki i ustawia tempo zapytań.
+    """
+    name = ""
+    label = ""
+    character_limit = 4800  # maks. liczba znaków w jednym zapytaniu
+    max_batch_items = None  # maks. liczba tekstów w jednym zapytaniu (None - bez limitu)
+    requests_per_second = 3.0  # zalecana liczba zapytań na sekundę
+    supports_packing = False  # True: paczka jest wysyłana jako jeden tekst rozdzielony nowymi liniami
+    requires_api_key = False
+    cacheable = True  # False: wyniki nie trafiają do pamięci tłumaczeń (np. silnik testowy)
+
+    def __init__(self, source: str, target: str, api_key: str = "", base_url: str = "", model: str = ""):
+        self.source = source
+        self.target = target
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+
+    @classmethod
+    def memory_engine(cls, base_url: str = "", model: str = "", **options) -> str:
+        """
+        Identyfikator silnika w pamięci tłumaczeń i punkcie kontrolnym (nazwa, model i adres API, jeśli podane),
+        aby tłumaczenia różnych silników i modeli nie mieszały się ze sobą.
+        """
+        return " ".join(part for part in (cls.name, model, base_url.rstrip('/')) if part)
+
+    def translate(self, text: str) -> str:
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        """Tłumaczy listę tekstów jednym zapytaniem (jeśli silnik na to pozwala). Zwraca listę tej samej długości."""
+        raise NotImplementedError
+
+class GoogleBackend(TranslationBackend):
+    """Darmowy Google Translate przez deep_translator (jedno zapytanie na tekst)."""
+    name = "google"
+    label = "Google Translate"
+    character_limit = 4800  # nieoficjalny limit Google to ~5000
+    requests_per_second = 3.0
+    supports_packing = True
+
+    def __init__(self, source: str, target: str, **options):
+        super().__init__(source, target, **options)
+        self.translator = GoogleTranslator(source=source, target=target)
+
+    def translate(self, text: str) -> str:
+        return self.translator.translate(text)
+
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        return [self.translator.translate(text) for text in texts]
+
+class DeepLBackend(TranslationBackend):
+    """DeepL API v2 - do 50 tekstów w jednym zapytaniu."""
+    name = "deepl"
+    label = "DeepL API"
+    character_limit = 30000  # limit ciała zapytania DeepL to 128 KiB
+    max_batch_items = 50
+    requests_per_second = 5.0
+    requires_api_key = True
+    # DeepL wymaga wariantu dla części języków docelowych
+    TARGET_VARIANTS = {"EN": "EN-GB", "PT": "PT-PT"}
+
+    def _url(self) -> str:
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/v2/translate"
+        # Klucze darmowego planu kończą się na ":fx" i działają tylko z osobnym adresem
+        host = "api-free.deepl.com" if self.api_key.endswith(":fx") else "api.deepl.com"
+        return f"https://{host}/v2/translate"
+
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        target = self.target.split('-')[0].upper()
+        payload = {
+            "text": texts,
+            "source_lang": self.source.split('-')[0].upper(),
+            "target_lang": self.TARGET_VARIANTS.get(target, target)
+        }
+        headers = {"Authorization": f"DeepL-Auth-Key {self.api_key}", "Content-Type": "application/json"}
+        response = requests.post(self._url(), json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 429:
+            raise RateLimitError("Too many requests (DeepL HTTP 429)")
+        if response.status_code == 456:
+            raise RuntimeError("Wyczerpano limit znaków w planie DeepL (HTTP 456).")
+        if response.status_code != 200:
+            raise RuntimeError(f"Błąd API DeepL: {response.status_code} - {response.text}")
+        return [item["text"] for item in response.json()["translations"]]
+
+class OpenAICompatibleBackend(TranslationBackend):
+    """Model językowy przez API zgodne z OpenAI (OpenAI lub lokalny serwer, np. z własnym adresem API)."""
+    name = "openai"
+    label = "OpenAI / API zgodne z OpenAI"
+    character_limit = 12000
+    max_batch_items = 100
+    requests_per_second = 1.0
+    DEFAULT_MODEL = "gpt-4o-mini"
+
+    @classmethod
+    def memory_engine(cls, base_url: str = "", model: str = "", **options) -> str:
+        # Bez podanego modelu używany jest DEFAULT_MODEL - klucz musi to odzwierciedlać
+        return super().memory_engine(base_url=base_url, model=model or cls.DEFAULT_MODEL)
+
+    def __init__(self, source: str, target: str, **options):
+        super().__init__(source, target, **options)
+        # Lokalne serwery zwykle nie sprawdzają klucza, ale klient OpenAI wymaga niepustej wartości
+        self.client = openai.OpenAI(api_key=self.api_key or "brak-klucza", base_url=self.base_url or None, timeout=REQUEST_TIMEOUT)
+
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        system_prompt = (
+            f"You are a professional translator for an e-commerce store. Translate every string in the JSON array "
+            f"from '{self.source}' to '{self.target}'. Keep numbers, units, product codes and HTML entities unchanged. "
+            'Return a JSON object {"translations": [...]} with exactly the same number of elements in the same order.'
+        )
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model or self.DEFAULT_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": json.dumps(texts, ensure_ascii=False)}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+        except openai.RateLimitError as e:
+            raise RateLimitError(f"Too many requests (OpenAI): {e}")
+        translations = json.loads(response.choices[0].message.content).get("translations", [])
+        if len(translations) != len(texts):
+            raise RuntimeError(f"Model zwrócił {len(translations)} tłumaczeń zamiast {len(texts)}.")
+        return [str(translation) for translation in translations]
+
+class OfflineBackend(TranslationBackend):
+    """
+    Silnik testowy bez sieci: zwraca teksty bez zmian (opcjonalnie z opóźnieniem).
+    Służy do pomiaru wydajności całego procesu bez zużywania limitów API.
+    """
+    name = "offline"
+    label = "Offline (test wydajności, bez tłumaczenia)"
+    character_limit = 4800
+    requests_per_second = 1000.0
+    cacheable = False
+    SIMULATED_LATENCY = 0.0  # sekundy na zapytanie
+
+    def translate_batch(self, texts: list[str]) -> list[str]:
+        if self.SIMULATED_LATENCY:
+            time.sleep(self.SIMULATED_LATENCY)
+        return list(texts)
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, DeepLBackend, OpenAICompatibleBackend, OfflineBackend)}
+
+def get_backend_class(name: str) -> type[TranslationBackend]:
+    if name not in BACKENDS:
+        raise ValueError(f"Nieznany silnik tłumaczeń: '{name}'. Dostępne: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+def create_backend(name: str, source: str, target: str, **options) -> TranslationBackend:
+    """Tworzy silnik tłumaczeń o podanej nazwie ('google', 'deepl', 'openai', 'offline')."""
+    return get_backend_class(name)(source, target, **options)
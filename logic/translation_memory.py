@@ -0,0 +1,97 @@
+import sqlite3
+import hashlib
+import threading
+import re
+
+TRANSLATION_MEMORY_FILE = "translation_memory.sqlite"
+SQLITE_MAX_VARIABLES = 900  # bezpieczny limit parametrów w jednym zapytaniu SQLite
+LEGACY_ENGINE = "google"  # pamięć sprzed wyboru silnika wypełniał wyłącznie Google Translate
+
+def normalize_text(text: str) -> str:
+    """Normalizuje tekst przed wyliczeniem klucza (zwinięte białe znaki, bez spacji na końcach)."""
+    return re.sub(r'\s+', ' ', text).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+class TranslationMemory:
+    """
+    Trwała pamięć tłumaczeń (SQLite) z kluczem (silnik, język źródłowy, język docelowy, hash znormalizowanego tekstu).
+    `engine` (np. TranslationBackend.memory_engine()) oddziela tłumaczenia różnych silników i modeli we wspólnym pliku.
+    Bezpieczna do użycia z wielu wątków.
+    """
+    def __init__(self, path: str, engine: str):
+        self.path = path
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(translations)")]
+            if columns and 'engine' not in columns:
+                self.connection.execute("ALTER TABLE translations RENAME TO translations_legacy")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " engine TEXT NOT NULL,"
+                " source_lang TEXT NOT NULL,"
+                " target_lang TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " source_text TEXT NOT NULL,"
+                " translated_text TEXT NOT NULL,"
+                " PRIMARY KEY (engine, source_lang, target_lang, text_hash))"
+            )
+            if columns and 'engine' not in columns:
+                # Plik w starym formacie (bez silnika w kluczu) - przenosimy wpisy jako tłumaczenia Google
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO translations SELECT ?, source_lang, target_lang, text_hash, source_text, translated_text"
+                    " FROM translations_legacy", [LEGACY_ENGINE]
+                )
+                self.connection.execute("DROP TABLE translations_legacy")
+            self.connection.commit()
+
+    def get_many(self, source_lang: str, target_lang: str, texts) -> dict[str, str]:
+        """Zwraca słownik {tekst: tłumaczenie} dla tekstów, które są już w pamięci."""
+        texts_by_hash = {}
+        for text in texts:
+            if text and text.strip():
+                texts_by_hash.setdefault(text_hash(text), []).append(text)
+
+        found = {}
+        hashes = list(texts_by_hash)
+        with self.lock:
+            for i in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                chunk = hashes[i:i + SQLITE_MAX_VARIABLES]
+                rows = self.connection.execute(
+                    f"SELECT text_hash, translated_text FROM translations"
+                    f" WHERE engine = ? AND source_lang = ? AND target_lang = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [self.engine, source_lang, target_lang, *chunk]
+                ).fetchall()
+                for hash_value, translated_text in rows:
+                    for text in texts_by_hash[hash_value]:
+                        found[text] = translated_text
+        return found
+
+    def put_many(self, source_lang: str, target_lang: str, pairs) -> None:
+        """Zapisuje pary (tekst, tłumaczenie). Puste teksty i brakujące tłumaczenia są pomijane."""
+        rows = [
+            (self.engine, source_lang, target_lang, text_hash(text), normalize_text(text), translated)
+            for text, translated in pairs
+            if text and text.strip() and translated
+        ]
+        if not rows:
+            return
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.connection.commit()
+
+    def count(self, source_lang: str, target_lang: str) -> int:
+        """Liczba zapisanych tłumaczeń silnika dla danej pary języków."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM translations WHERE engine = ? AND source_lang = ? AND target_lang = ?",
+                [self.engine, source_lang, target_lang]
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
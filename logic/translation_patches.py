@@ -0,0 +1,54 @@
+import os
+import tempfile
+import pandas as pd
+
+PATCH_CHUNK_ROWS = 20000  # wierszy pliku wynikowego wczytywanych naraz
+
+def _id_key(value) -> str:
+    """ID jako tekst, tak jak zapisano go w CSV (7.0 z kolumny z brakami pandas zapisuje jako 7)."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def apply_translation_patches(output_path: str, patches: list[dict], id_column: str, chunk_rows: int = PATCH_CHUNK_ROWS) -> dict:
+    """
+    Nanosi poprawki ({'product_id', 'column', 'new_content'}) na plik wynikowy tłumacza.
+    Plik jest czytany w paczkach wierszy jako tekst (bez zmiany formatu wartości), każda kolumna jest uzupełniana
+    jednym mapowaniem po ID, a wynik trafia do pliku tymczasowego, który na końcu zastępuje oryginał.
+    Zwraca słownik: 'applied' (liczba zmienionych komórek), 'missing_ids' (ID bez wiersza), 'missing_columns'.
+    """
+    patches_by_column = {}
+    for patch in patches:
+        patches_by_column.setdefault(patch['column'], {})[_id_key(patch['product_id'])] = patch['new_content']
+
+    header = pd.read_csv(output_path, nrows=0, encoding='utf-8-sig').columns
+    if id_column not in header:
+        raise ValueError(f"Kolumna ID '{id_column}' nie istnieje w pliku wynikowym.")
+    missing_columns = [col for col in patches_by_column if col not in header]
+    for col in missing_columns:
+        del patches_by_column[col]
+
+    all_ids = set().union(*patches_by_column.values()) if patches_by_column else set()
+    found_ids, applied = set(), 0
+
+    # Plik tymczasowy w tym samym katalogu, aby os.replace było atomowe
+    fd, temp_path = tempfile.mkstemp(suffix=".csv", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8-sig', newline='') as temp_file:
+            reader = pd.read_csv(output_path, dtype=str, keep_default_na=False, chunksize=chunk_rows, encoding='utf-8-sig')
+            for chunk_number, chunk in enumerate(reader):
+                ids = chunk[id_column]
+                found_ids.update(ids[ids.isin(all_ids)])
+                for col, new_values in patches_by_column.items():
+                    mask = ids.isin(new_values.keys())
+                    if mask.any():
+                        chunk.loc[mask, col] = ids[mask].map(new_values)
+                        applied += int(mask.sum())
+                chunk.to_csv(temp_file, header=(chunk_number == 0), index=False)
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {'applied': applied, 'missing_ids': sorted(all_ids - found_ids), 'missing_columns': missing_columns}
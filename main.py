@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QPushButton, QLineEdit, QLabel, QTextEdit, QDialog, QFormLayout, 
@@ -228,6 +229,7 @@ class MainWindow(QMainWindow):
 <ul>
     <li>Moduł do poprawnego mapowania kategorii używa polskiej wersji językowej obu menu jako bazy.</li>
     <li>Synchronizacja dotyczy tylko kolejności. Nazwy i inne atrybuty kategorii nie są zmieniane.</li>
+    <li>Można podać kilka języków naraz (np. "eng, cze, ger") - wszystkie zostaną zaktualizowane w jednym przebiegu.</li>
 </ul>'''
         btn_update_priorities, update_priorities_layout = create_button_with_info("Synchronizuj priorytety węzłów", update_priorities_tooltip)
         btn_update_priorities.clicked.connect(self.run_update_priorities_task)
@@ -235,7 +237,8 @@ class MainWindow(QMainWindow):
 
         sync_filters_tooltip = '''<h3>Moduł: Synchronizuj filtry menu</h3>
 <p><b>Cel:</b> Porównuje dwa menu (źródłowe i docelowe) i kopiuje ustawienia filtrów dla pasujących węzłów.</p>
-<p>Proces mapuje węzły na podstawie ich pełnej ścieżki (np. "Kategoria/Podkategoria"), a następnie dla każdej znalezionej pary synchronizuje aktywne filtry, dopasowując je po nazwie.</p>'''
+<p>Proces mapuje węzły na podstawie ich pełnej ścieżki (np. "Kategoria/Podkategoria"), a następnie dla każdej znalezionej pary synchronizuje aktywne filtry, dopasowując je po nazwie.</p>
+<p>Można podać kilka języków docelowych (np. "cze, ger") - filtry źródłowe są wtedy pobierane tylko raz.</p>'''
         btn_sync_filters, sync_filters_layout = create_button_with_info("Synchronizuj filtry menu", sync_filters_tooltip)
         btn_sync_filters.clicked.connect(self.run_sync_filters_task)
         left_column_layout.addLayout(sync_filters_layout)
@@ -244,15 +247,15 @@ class MainWindow(QMainWindow):
 <p><b>Cel:</b> Skopiowanie opisów górnych i dolnych z polskiej wersji menu źródłowego do wybranej wersji językowej menu docelowego.</p>
 <p><b>Działanie:</b></p>
 <ol>
-    <li>Moduł pobiera wszystkie kategorie z <b>menu źródłowego</b> (w języku polskim) i tworzy mapę ich nazw oraz przypisanych do nich opisów (górnego i dolnego).</li>
-    <li>Następnie pobiera kategorie z <b>menu docelowego</b> (również po polsku), aby znaleźć ich odpowiedniki na podstawie <b>identycznej nazwy</b>.</li>
+    <li>Moduł pobiera wszystkie kategorie z <b>menu źródłowego</b> (w języku polskim) i tworzy indeks ich pełnych ścieżek (np. "Buty/Sportowe") oraz przypisanych do nich opisów (górnego i dolnego).</li>
+    <li>Następnie pobiera kategorie z <b>menu docelowego</b> (również po polsku), aby znaleźć ich odpowiedniki na podstawie <b>identycznej pełnej ścieżki</b>. Ścieżki występujące wielokrotnie są zgłaszane jako kolizje i pomijane.</li>
     <li>Dla każdej znalezionej pary, moduł porównuje opisy. Jeśli się różnią, przygotowuje aktualizację.</li>
-    <li>Aktualizacja jest wysyłana do menu docelowego dla wybranego <b>docelowego języka</b>. W praktyce oznacza to, że np. niemieckie opisy w menu docelowym zostaną nadpisane polskimi opisami z menu źródłowego.</li>
+    <li>Aktualizacja jest wysyłana do menu docelowego dla wybranych <b>docelowych języków</b> (można podać kilka, np. "eng, cze, ger"). W praktyce oznacza to, że np. niemieckie opisy w menu docelowym zostaną nadpisane polskimi opisami z menu źródłowego.</li>
 </ol>
 <p><b>Ważne:</b></p>
 <ul>
     <li>Moduł jest przydatny do ujednolicania lub "resetowania" opisów w menu obcojęzycznym, aby miały tę samą treść co w menu polskim (np. przed procesem tłumaczenia).</li>
-    <li>Kategorie w obu menu muszą mieć <b>identyczne nazwy w języku polskim</b>, aby zostały poprawnie dopasowane.</li>
+    <li>Kategorie w obu menu muszą mieć <b>identyczne ścieżki w języku polskim</b>, aby zostały poprawnie dopasowane.</li>
 </ul>'''
         btn_update_descriptions, update_descriptions_layout = create_button_with_info("Synchronizuj opisy góra/dół", update_descriptions_tooltip)
         btn_update_descriptions.clicked.connect(self.run_update_descriptions_task)
@@ -575,6 +578,8 @@ class MainWindow(QMainWindow):
             button.setEnabled(enabled)
 
 if __name__ == "__main__":
+    # Wymagane przez pulę procesów tłumacza w wersji spakowanej do .exe
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     STYLESHEET = """
         QMainWindow, QDialog { background-color: #2B2B2B; color: #F0F0F0; }
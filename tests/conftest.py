@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Testy importują moduły aplikacji (logic, gui) z katalogu głównego repozytorium
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+import math
+import time
+
+import pandas as pd
+
+from logic import attribute_translator, translation_backends
+from logic.rate_limiter import RateLimiter
+
+BASELINE_BATCH_SIZE = 20  # domyślna paczka tłumacza atrybutów
+BASELINE_BATCHES_PER_SECOND = 1.0  # dawny RateLimiter: 1 s odstępu przed każdą paczką, teksty paczki jeden po drugim
+
+class PerTextBackend(translation_backends.TranslationBackend):
+    """Silnik w stylu Google: paczka tłumaczona tekst po tekście, bez sieci."""
+    name = "per-text-test"
+    label = "Test (tekst po tekście)"
+    supports_packing = True
+    cacheable = False
+    calls = 0
+
+    def translate_batch(self, texts):
+        PerTextBackend.calls += len(texts)
+        return [f"[{self.target}] {text}" for text in texts]
+
+def _write_input(path, texts):
+    descriptions = [f'<p><img src="{i}.jpg" alt="{text}"></p>' for i, text in enumerate(texts)]
+    pd.DataFrame({'ID': range(len(texts)), 'opis': descriptions}).to_csv(path, index=False)
+
+def test_per_text_backend_is_not_slower_than_baseline(tmp_path, monkeypatch):
+    monkeypatch.setitem(translation_backends.BACKENDS, PerTextBackend.name, PerTextBackend)
+    monkeypatch.setattr(PerTextBackend, 'calls', 0)
+    texts = [f"Zdjęcie produktu {i}" for i in range(60)]
+    input_path = tmp_path / "opisy.csv"
+    _write_input(input_path, texts)
+
+    started = time.monotonic()
+    attribute_translator.run_attribute_translator(
+        str(input_path), 'ID', 'opis', 'en', num_workers=1, batch_size=BASELINE_BATCH_SIZE,
+        progress_callback=lambda message: None, backend_name=PerTextBackend.name, use_translation_memory=False
+    )
+    elapsed = time.monotonic() - started
+
+    # Pierwsza paczka startuje od razu, każda kolejna najpóźniej po 1 s - tak jak przed zrównolegleniem
+    baseline = (math.ceil(len(texts) / BASELINE_BATCH_SIZE) - 1) / BASELINE_BATCHES_PER_SECOND
+    assert elapsed <= baseline + 0.5
+    assert PerTextBackend.calls == len(texts)
+    result = pd.read_csv(tmp_path / "opisy_generated.csv")
+    assert all(f'alt="[en] {text}"' in description for text, description in zip(texts, result['opis_generated']))
+
+def test_rate_limiter_ramps_up_and_backs_off():
+    limiter = RateLimiter(1.0)
+    for _ in range(RateLimiter.SUCCESSES_BEFORE_SPEEDUP * 20):
+        limiter.on_success()
+    assert limiter.rate == 2.0  # domyślne maksimum to dwukrotność tempa startowego
+    assert limiter.on_rate_limited() == 1.0
+    for _ in range(5):
+        limiter.on_rate_limited()
+    assert limiter.rate == 1.0 / 8
+
+def test_clean_run_removes_stale_errors_file(tmp_path, monkeypatch):
+    monkeypatch.setitem(translation_backends.BACKENDS, PerTextBackend.name, PerTextBackend)
+    input_path = tmp_path / "opisy.csv"
+    _write_input(input_path, ["Kubek", "Talerz"])
+    errors_path = tmp_path / "opisy_generated_errors.txt"
+    errors_path.write_text("[EN] błąd z poprzedniego przebiegu", encoding='utf-8')
+
+    attribute_translator.run_attribute_translator(
+        str(input_path), 'ID', 'opis', 'en', num_workers=1, batch_size=BASELINE_BATCH_SIZE,
+        progress_callback=lambda message: None, backend_name=PerTextBackend.name, use_translation_memory=False
+    )
+    assert not errors_path.exists()
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pandas as pd
+
+from logic import attribute_translator, translation_backends
+from logic.translation_memory import TranslationMemory, LEGACY_ENGINE, text_hash, normalize_text
+
+class EchoBackend(translation_backends.TranslationBackend):
+    """Jak lokalny serwer testowy: zwraca teksty bez zmian, ale jego wyniki trafiają do pamięci."""
+    name = "echo-test"
+    label = "Test (echo)"
+    calls = 0
+
+    def translate_batch(self, texts):
+        EchoBackend.calls += len(texts)
+        return list(texts)
+
+class UpperBackend(translation_backends.TranslationBackend):
+    name = "upper-test"
+    label = "Test (wielkie litery)"
+    calls = 0
+
+    def translate_batch(self, texts):
+        UpperBackend.calls += len(texts)
+        return [text.upper() for text in texts]
+
+def _run(input_path, backend_name):
+    attribute_translator.run_attribute_translator(
+        str(input_path), 'ID', 'opis', 'en', num_workers=2, batch_size=10,
+        progress_callback=lambda message: None, backend_name=backend_name
+    )
+    return pd.read_csv(str(input_path).replace(".csv", "_generated.csv"))['opis_generated'].tolist()
+
+def test_backend_does_not_reuse_translations_of_another_backend(tmp_path, monkeypatch):
+    for backend in (EchoBackend, UpperBackend):
+        monkeypatch.setitem(translation_backends.BACKENDS, backend.name, backend)
+        monkeypatch.setattr(backend, 'calls', 0)
+    monkeypatch.setattr(attribute_translator, 'TRANSLATION_MEMORY_FILE', str(tmp_path / "memory.sqlite"))
+    texts = [f"Zdjęcie {i}" for i in range(25)]
+    input_path = tmp_path / "opisy.csv"
+    pd.DataFrame({'ID': range(len(texts)), 'opis': [f'<img alt="{text}">' for text in texts]}).to_csv(input_path, index=False)
+
+    _run(input_path, EchoBackend.name)
+    assert EchoBackend.calls == len(texts)
+
+    # Echo zapisało w pamięci nieprzetłumaczone teksty - inny silnik musi je przetłumaczyć sam
+    result = _run(input_path, UpperBackend.name)
+    assert UpperBackend.calls == len(texts)
+    assert result == [f'<img alt="{text.upper()}">' for text in texts]
+
+    # Ten sam silnik korzysta z własnych wpisów
+    _run(input_path, UpperBackend.name)
+    assert UpperBackend.calls == len(texts)
+
+def test_openai_models_and_servers_have_separate_entries(tmp_path):
+    backend = translation_backends.OpenAICompatibleBackend
+    local = backend.memory_engine(base_url="http://localhost:8000/v1", model="")
+    cloud = backend.memory_engine(base_url="", model="")
+    other_model = backend.memory_engine(base_url="", model="gpt-4o")
+    assert len({local, cloud, other_model}) == 3
+
+    path = str(tmp_path / "memory.sqlite")
+    TranslationMemory(path, local).put_many('pl', 'en', [("Kubek", "Kubek")])
+    assert TranslationMemory(path, cloud).get_many('pl', 'en', ["Kubek"]) == {}
+    assert TranslationMemory(path, local).get_many('pl', 'en', ["Kubek"]) == {"Kubek": "Kubek"}
+
+def test_legacy_memory_is_kept_as_google(tmp_path):
+    path = str(tmp_path / "memory.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE translations (source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, text_hash TEXT NOT NULL,"
+        " source_text TEXT NOT NULL, translated_text TEXT NOT NULL, PRIMARY KEY (source_lang, target_lang, text_hash))"
+    )
+    connection.execute("INSERT INTO translations VALUES ('pl', 'en', ?, ?, 'Mug')", [text_hash("Kubek"), normalize_text("Kubek")])
+    connection.commit()
+    connection.close()
+
+    assert TranslationMemory(path, LEGACY_ENGINE).get_many('pl', 'en', ["Kubek"]) == {"Kubek": "Mug"}
+    assert TranslationMemory(path, "openai gpt-4o-mini").get_many('pl', 'en', ["Kubek"]) == {}
@@ -0,0 +1,17 @@
+from gui.translator_dialog import packed_segments_match
+
+def test_matching_segments_are_accepted():
+    texts = ["Kubek ceramiczny", "Pojemność 300 ml", "Biały"]
+    assert packed_segments_match(texts, ["Ceramic mug", "Capacity 300 ml", "White"])
+
+def test_shifted_segments_are_rejected():
+    # Tłumacz połączył dwa fragmenty i rozdzielił inny - liczba linii się zgadza, ale treść jest przesunięta
+    texts = ["Kubek", "Opis bardzo długiego produktu z wieloma szczegółami", "Biały"]
+    assert not packed_segments_match(texts, ["Mug Description of a very long product", "with many details", "White"])
+    texts = ["Kubek ceramiczny", "Pojemność 300 ml", "Biały"]
+    assert not packed_segments_match(texts, ["Ceramic mug", "Capacity", "300 ml White"])
+
+def test_empty_or_missing_segments_are_rejected():
+    texts = ["Kubek", "Biały"]
+    assert not packed_segments_match(texts, ["Mug", ""])
+    assert not packed_segments_match(texts, ["Mug"])